@@ -8,7 +8,7 @@ from .download import check_and_download
 
 # https://github.com/HolyWu/vs-rife/blob/master/vsrife/__init__.py
 class M2M:
-    def __init__(self):
+    def __init__(self, width=None, height=None, graph=False, fp16=False, multi=None):
         self.cache = True
         self.amount_input_img = 2
 
@@ -18,9 +18,15 @@ class M2M:
         model_path = "/workspace/tensorrt/models/M2M.pth"
         check_and_download(model_path)
 
-        self.model = M2M_PWC()
+        self.model = M2M_PWC(graph=graph, dtype=torch.float16 if fp16 else None)
         self.model.load_state_dict(torch.load(model_path))
-        self.model.eval().cuda()
+        self.model.eval().cuda().requires_grad_(False)
+        self.model.netFlow.freeze_prelu()
+
+        # compile the kernels of the flow network up front, execute() passes multi on as the
+        # ratio of the model which sets the resolution of the flow network
+        if width is not None and height is not None and multi is not None:
+            self.model.warmup(height, width, multi)
 
     def execute(self, I0, I1, multi):
         tenSteps = [
@@ -65,11 +65,40 @@ def backwarp(tenIn: torch.Tensor, tenFlow: torch.Tensor):
         tenFlow = tenFlow * (2.0 / ((tenFlow.shape[3] and tenFlow.shape[2]) - 1.0))
 
     elif tenFlow.shape[3] != tenFlow.shape[2]:
-        tenFlow = tenFlow * torch.tensor(
-            data=[2.0 / (tenFlow.shape[3] - 1.0), 2.0 / (tenFlow.shape[2] - 1.0)],
-            dtype=tenFlow.dtype,
-            device=tenFlow.device,
-        ).view(1, 2, 1, 1)
+        # cached so that no host to device copy happens while capturing a cuda graph
+        if (
+            "scale"
+            + str(tenFlow.dtype)
+            + str(tenFlow.device)
+            + str(tenFlow.shape[2])
+            + str(tenFlow.shape[3])
+            not in objBackwarpcache
+        ):
+            tenScale = torch.tensor(
+                data=[2.0 / (tenFlow.shape[3] - 1.0), 2.0 / (tenFlow.shape[2] - 1.0)],
+                dtype=tenFlow.dtype,
+                device=tenFlow.device,
+            ).view(1, 2, 1, 1)
+
+            objBackwarpcache[
+                "scale"
+                + str(tenFlow.dtype)
+                + str(tenFlow.device)
+                + str(tenFlow.shape[2])
+                + str(tenFlow.shape[3])
+            ] = tenScale
+        # end
+
+        tenFlow = (
+            tenFlow
+            * objBackwarpcache[
+                "scale"
+                + str(tenFlow.dtype)
+                + str(tenFlow.device)
+                + str(tenFlow.shape[2])
+                + str(tenFlow.shape[3])
+            ]
+        )
 
     # end
 
@@ -97,7 +126,12 @@ def backwarp(tenIn: torch.Tensor, tenFlow: torch.Tensor):
 ##########################################################
 
 
+# kernels are rendered once per key in objCudacache, sizes and strides are baked into the
+# rendered source, so every new shape (batch size included) still renders and compiles a new
+# kernel, repeated calls with the same shapes only look up the cache
 objCudacache = {}
+objTemplatecache = {}
+objStream = collections.namedtuple("Stream", "ptr")
 
 
 def cuda_int32(intIn: int):
@@ -114,48 +148,175 @@ def cuda_float32(fltIn: float):
 # end
 
 
-def cuda_kernel(strFunction: str, strKernel: str, objVariables: typing.Dict):
-    if "device" not in objCudacache:
-        objCudacache["device"] = torch.cuda.get_device_name()
-    # end
+def cuda_stream():
+    return objStream(torch.cuda.current_stream().cuda_stream)
+
+
+# end
+
 
-    strKey = strFunction
+def cuda_key(strFunction: str, objVariables: typing.Dict):
+    objKey = [strFunction]
 
     for strVariable in objVariables:
         objValue = objVariables[strVariable]
 
-        strKey += strVariable
+        if type(objValue) == torch.Tensor:
+            objKey.append(
+                (strVariable, objValue.dtype, objValue.shape, objValue.stride())
+            )
+
+        elif True:
+            objKey.append((strVariable, type(objValue), objValue))
+
+        # end
+    # end
+
+    return tuple(objKey)
+
+
+# end
+
+
+def cuda_template(strKernel: str):
+    if strKernel not in objTemplatecache:
+        objTemplate = []
+        intLast = 0
+
+        for objMatch in re.finditer(
+            "(SIZE_|OFFSET_|VALUE_|LDG_)([0-4])(\\()", strKernel
+        ):
+            if objMatch.start() < intLast:
+                continue  # nested within the arguments of a previous match
+            # end
+
+            intStart = objMatch.span()[1]
+            intStop = objMatch.span()[1]
+            intParentheses = 1
+            intSplits = [intStart - 1]
+
+            while True:
+                intParentheses += 1 if strKernel[intStop] == "(" else 0
+                intParentheses -= 1 if strKernel[intStop] == ")" else 0
+
+                if intParentheses == 0:
+                    break
+
+                elif intParentheses == 1 and strKernel[intStop] == ",":
+                    intSplits.append(intStop)
+
+                # end
+
+                intStop += 1
+            # end
+
+            intSplits.append(intStop)
+
+            strArgs = [
+                strKernel[intSplits[intArg] + 1 : intSplits[intArg + 1]]
+                for intArg in range(len(intSplits) - 1)
+            ]
+
+            if objMatch.group(1) != "SIZE_":
+                assert int(objMatch.group(2)) == len(strArgs) - 1
+            # end
+
+            objTemplate.append(strKernel[intLast : objMatch.start()])
+            objTemplate.append(
+                (
+                    objMatch.group(1),
+                    int(objMatch.group(2)),
+                    strArgs[0].strip(),
+                    [
+                        cuda_template(
+                            strArg.replace("{", "(").replace("}", ")").strip()
+                        )
+                        for strArg in strArgs[1:]
+                    ],
+                )
+            )
+
+            intLast = intStop + 1
+        # end
+
+        objTemplate.append(strKernel[intLast:])
+
+        objTemplatecache[strKernel] = objTemplate
+    # end
+
+    return objTemplatecache[strKernel]
+
+
+# end
+
 
-        if objValue is None:
+def cuda_render(objTemplate: typing.List, objVariables: typing.Dict):
+    strKernel = []
+
+    for objToken in objTemplate:
+        if type(objToken) == str:
+            strKernel.append(objToken)
             continue
+        # end
 
-        elif type(objValue) == int:
-            strKey += str(objValue)
+        strMacro, intArgs, strTensor, objArgs = objToken
 
-        elif type(objValue) == float:
-            strKey += str(objValue)
+        if strMacro == "SIZE_":
+            intSizes = objVariables[strTensor].size()
 
-        elif type(objValue) == bool:
-            strKey += str(objValue)
+            strKernel.append(
+                str(
+                    intSizes[intArgs]
+                    if torch.is_tensor(intSizes[intArgs]) == False
+                    else intSizes[intArgs].item()
+                )
+            )
 
-        elif type(objValue) == str:
-            strKey += objValue
+        elif strMacro == "OFFSET_" or strMacro == "VALUE_" or strMacro == "LDG_":
+            intStrides = objVariables[strTensor].stride()
 
-        elif type(objValue) == torch.Tensor:
-            strKey += str(objValue.dtype)
-            strKey += str(objValue.shape)
-            strKey += str(objValue.stride())
+            strIndex = []
 
-        elif True:
-            print(strVariable, type(objValue))
-            assert False
+            for intArg in range(intArgs):
+                strIndex.append(
+                    "(("
+                    + cuda_render(objArgs[intArg], objVariables)
+                    + ")*"
+                    + str(
+                        intStrides[intArg]
+                        if torch.is_tensor(intStrides[intArg]) == False
+                        else intStrides[intArg].item()
+                    )
+                    + ")"
+                )
+            # end
+
+            if strMacro == "OFFSET_":
+                strKernel.append("(" + str.join("+", strIndex) + ")")
+
+            elif strMacro == "VALUE_":
+                strKernel.append(strTensor + "[" + str.join("+", strIndex) + "]")
+
+            elif strMacro == "LDG_":
+                strKernel.append(
+                    "__ldg(&" + strTensor + "[" + str.join("+", strIndex) + "])"
+                )
+
+            # end
 
         # end
     # end
 
-    strKey += objCudacache["device"]
+    return str.join("", strKernel)
+
+
+# end
+
+
+def cuda_kernel(strFunction: str, strKernel: str, objVariables: typing.Dict):
+    objKey = cuda_key(strFunction, objVariables)
 
-    if strKey not in objCudacache:
+    if objKey not in objCudacache:
         for strVariable in objVariables:
             objValue = objVariables[strVariable]
 
@@ -203,265 +364,290 @@ def cuda_kernel(strFunction: str, strKernel: str, objVariables: typing.Dict):
             # end
         # end
 
-        while True:
-            objMatch = re.search("(SIZE_)([0-4])(\()([^\)]*)(\))", strKernel)
+        strKernel = cuda_render(cuda_template(strKernel), objVariables)
 
-            if objMatch is None:
-                break
-            # end
+        objCudacache[objKey] = {"strFunction": strFunction, "strKernel": strKernel}
+    # end
 
-            intArg = int(objMatch.group(2))
+    return objKey
 
-            strTensor = objMatch.group(4)
-            intSizes = objVariables[strTensor].size()
 
-            strKernel = strKernel.replace(
-                objMatch.group(),
-                str(
-                    intSizes[intArg]
-                    if torch.is_tensor(intSizes[intArg]) == False
-                    else intSizes[intArg].item()
-                ),
-            )
-        # end
+# end
 
-        while True:
-            objMatch = re.search("(OFFSET_)([0-4])(\()", strKernel)
 
-            if objMatch is None:
-                break
-            # end
+@cupy.memoize(for_each_device=True)
+def cuda_compile(strFunction: str, strKernel: str):
+    if "CUDA_HOME" not in os.environ:
+        os.environ["CUDA_HOME"] = "/usr/local/cuda/"
+    # end
 
-            intStart = objMatch.span()[1]
-            intStop = objMatch.span()[1]
-            intParentheses = 1
+    return cupy.cuda.compile_with_cache(
+        strKernel,
+        tuple(
+            [
+                "-I " + os.environ["CUDA_HOME"],
+                "-I " + os.environ["CUDA_HOME"] + "/include",
+            ]
+        ),
+    ).get_function(strFunction)
 
-            while True:
-                intParentheses += 1 if strKernel[intStop] == "(" else 0
-                intParentheses -= 1 if strKernel[intStop] == ")" else 0
 
-                if intParentheses == 0:
-                    break
-                # end
+# end
 
-                intStop += 1
-            # end
 
-            intArgs = int(objMatch.group(2))
-            strArgs = strKernel[intStart:intStop].split(",")
+@cupy.memoize(for_each_device=True)
+def cuda_launch(objKey: typing.Tuple):
+    # keys whose kernels render to identical source share the loaded module, compiling new
+    # source is still up to nvrtc and the cupy disk cache
+    return cuda_compile(
+        objCudacache[objKey]["strFunction"], objCudacache[objKey]["strKernel"]
+    )
 
-            assert intArgs == len(strArgs) - 1
 
-            strTensor = strArgs[0]
-            intStrides = objVariables[strTensor].stride()
+# end
 
-            strIndex = []
 
-            for intArg in range(intArgs):
-                strIndex.append(
-                    "(("
-                    + strArgs[intArg + 1].replace("{", "(").replace("}", ")").strip()
-                    + ")*"
-                    + str(
-                        intStrides[intArg]
-                        if torch.is_tensor(intStrides[intArg]) == False
-                        else intStrides[intArg].item()
-                    )
-                    + ")"
-                )
-            # end
+def cuda_graph(objGraphs: typing.Dict, fnBody, tenInputs: typing.List):
+    objKey = tuple(
+        [
+            (tenIn.dtype, tenIn.device, tenIn.shape, tenIn.stride())
+            for tenIn in tenInputs
+        ]
+    )
 
-            strKernel = strKernel.replace(
-                "OFFSET_" + str(intArgs) + "(" + strKernel[intStart:intStop] + ")",
-                "(" + str.join("+", strIndex) + ")",
-            )
-        # end
+    if objKey not in objGraphs:
+        tenStatic = [tenIn.clone() for tenIn in tenInputs]
 
-        while True:
-            objMatch = re.search("(VALUE_)([0-4])(\()", strKernel)
+        # warm up on a side stream so that cudnn autotuning and kernel compilation stay out of the capture
+        objSide = torch.cuda.Stream()
+        objSide.wait_stream(torch.cuda.current_stream())
 
-            if objMatch is None:
-                break
+        with torch.cuda.stream(objSide):
+            for intWarmup in range(3):
+                fnBody(*tenStatic)
             # end
+        # end
 
-            intStart = objMatch.span()[1]
-            intStop = objMatch.span()[1]
-            intParentheses = 1
+        torch.cuda.current_stream().wait_stream(objSide)
 
-            while True:
-                intParentheses += 1 if strKernel[intStop] == "(" else 0
-                intParentheses -= 1 if strKernel[intStop] == ")" else 0
+        objGraph = torch.cuda.CUDAGraph()
 
-                if intParentheses == 0:
-                    break
-                # end
+        with torch.cuda.graph(objGraph):
+            tenOutputs = fnBody(*tenStatic)
+        # end
 
-                intStop += 1
-            # end
+        objGraphs[objKey] = (objGraph, tenStatic, tenOutputs)
+    # end
 
-            intArgs = int(objMatch.group(2))
-            strArgs = strKernel[intStart:intStop].split(",")
+    objGraph, tenStatic, tenOutputs = objGraphs[objKey]
 
-            assert intArgs == len(strArgs) - 1
+    for tenIn, tenStat in zip(tenInputs, tenStatic):
+        tenStat.copy_(tenIn)
+    # end
 
-            strTensor = strArgs[0]
-            intStrides = objVariables[strTensor].stride()
+    objGraph.replay()
 
-            strIndex = []
+    return [tenOut.clone() for tenOut in tenOutputs]
 
-            for intArg in range(intArgs):
-                strIndex.append(
-                    "(("
-                    + strArgs[intArg + 1].replace("{", "(").replace("}", ")").strip()
-                    + ")*"
-                    + str(
-                        intStrides[intArg]
-                        if torch.is_tensor(intStrides[intArg]) == False
-                        else intStrides[intArg].item()
-                    )
-                    + ")"
-                )
-            # end
 
-            strKernel = strKernel.replace(
-                "VALUE_" + str(intArgs) + "(" + strKernel[intStart:intStop] + ")",
-                strTensor + "[" + str.join("+", strIndex) + "]",
-            )
-        # end
+# end
+
 
-        objCudacache[strKey] = {"strFunction": strFunction, "strKernel": strKernel}
+##########################################################
+
+
+def costvol_out(tenOne: torch.Tensor, tenTwo: torch.Tensor, tenOut: torch.Tensor):
+    # tenOut may be any strided view, like the channel slice of a larger tensor
+    if tenOut.dtype == torch.float16:
+        assert tenOne.shape[1] % 2 == 0
     # end
 
-    return strKey
+    tenOne = tenOne.to(tenOut.dtype)
+    tenTwo = tenTwo.to(tenOut.dtype)
+
+    if tenOut.dtype == torch.float16:
+        objKey = cuda_kernel(
+            "costvol_half2",
+            """
+        #include <cuda_fp16.h>
+
+        extern "C" __global__ void __launch_bounds__(512) costvol_half2(
+            const int n,
+            const __half* __restrict__ tenOne,
+            const __half* __restrict__ tenTwo,
+            __half* __restrict__ tenOut
+        ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
+            const int intN = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut) );
+            const int intC = -1;
+            const int intY = ( intIndex / SIZE_3(tenOut)                  ) % SIZE_2(tenOut);
+            const int intX = ( intIndex                                   ) % SIZE_3(tenOut);
+            const float fltScale = 1.0f / {{intChans}};
+
+            __half2 fltOne[{{intChans}} / 2];
+
+            for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 2) {
+                fltOne[intValue / 2] = __halves2half2(VALUE_4(tenOne, intN, intValue, intY, intX), VALUE_4(tenOne, intN, intValue + 1, intY, intX));
+            }
+
+            int intOffset = OFFSET_4(tenOut, intN, 0, intY, intX);
+
+            for (int intOy = intY - 4; intOy <= intY + 4; intOy += 1) {
+                for (int intOx = intX - 4; intOx <= intX + 4; intOx += 1) {
+                    __half2 fltValue = __float2half2_rn(0.0f);
+
+                    if ((intOy >= 0) && (intOy < SIZE_2(tenOut)) && (intOx >= 0) && (intOx < SIZE_3(tenOut))) {
+                        for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 2) {
+                            fltValue = __hadd2(fltValue, __habs2(__hsub2(fltOne[intValue / 2], __halves2half2(VALUE_4(tenTwo, intN, intValue, intOy, intOx), VALUE_4(tenTwo, intN, intValue + 1, intOy, intOx)))));
+                        }
+                    } else {
+                        for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 2) {
+                            fltValue = __hadd2(fltValue, __habs2(fltOne[intValue / 2]));
+                        }
+                    }
 
+                    tenOut[intOffset] = __float2half((__low2float(fltValue) + __high2float(fltValue)) * fltScale);
+                    intOffset += OFFSET_4(tenOut, 0, 1, 0, 0);
+                }
+            }
+        } }
+    """,
+            {
+                "intChans": tenOne.shape[1],
+                "tenOne": tenOne,
+                "tenTwo": tenTwo,
+                "tenOut": tenOut,
+            },
+        )
 
-# end
+    elif tenOut.dtype != torch.float16:
+        objKey = cuda_kernel(
+            "costvol_out",
+            """
+        extern "C" __global__ void __launch_bounds__(512) costvol_out(
+            const int n,
+            const {{type}}* __restrict__ tenOne,
+            const {{type}}* __restrict__ tenTwo,
+            {{type}}* __restrict__ tenOut
+        ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
+            const int intN = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut) );
+            const int intC = -1;
+            const int intY = ( intIndex / SIZE_3(tenOut)                  ) % SIZE_2(tenOut);
+            const int intX = ( intIndex                                   ) % SIZE_3(tenOut);
+            const {{type}} fltScale = 1.0f / {{intChans}};
+
+            {{type}} fltOne[{{intChans}}];
+
+            for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
+                fltOne[intValue] = VALUE_4(tenOne, intN, intValue, intY, intX);
+            }
+
+            int intOffset = OFFSET_4(tenOut, intN, 0, intY, intX);
+
+            for (int intOy = intY - 4; intOy <= intY + 4; intOy += 1) {
+                for (int intOx = intX - 4; intOx <= intX + 4; intOx += 1) {
+                    {{type}} fltValue = 0.0f;
+
+                    if ((intOy >= 0) && (intOy < SIZE_2(tenOut)) && (intOx >= 0) && (intOx < SIZE_3(tenOut))) {
+                        for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
+                            fltValue += abs(fltOne[intValue] - VALUE_4(tenTwo, intN, intValue, intOy, intOx));
+                        }
+                    } else {
+                        for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
+                            fltValue += abs(fltOne[intValue]);
+                        }
+                    }
 
+                    tenOut[intOffset] = fltValue * fltScale;
+                    intOffset += OFFSET_4(tenOut, 0, 1, 0, 0);
+                }
+            }
+        } }
+    """,
+            {
+                "intChans": tenOne.shape[1],
+                "tenOne": tenOne,
+                "tenTwo": tenTwo,
+                "tenOut": tenOut,
+            },
+        )
 
-@cupy.memoize(for_each_device=True)
-def cuda_launch(strKey: str):
-    if "CUDA_HOME" not in os.environ:
-        os.environ["CUDA_HOME"] = "/usr/local/cuda/"
     # end
 
-    return cupy.cuda.compile_with_cache(
-        objCudacache[strKey]["strKernel"],
-        tuple(
+    cuda_launch(objKey)(
+        grid=tuple(
             [
-                "-I " + os.environ["CUDA_HOME"],
-                "-I " + os.environ["CUDA_HOME"] + "/include",
+                int(
+                    ((tenOut.shape[0] * tenOut.shape[2] * tenOut.shape[3]) + 512 - 1)
+                    / 512
+                ),
+                1,
+                1,
             ]
         ),
-    ).get_function(objCudacache[strKey]["strFunction"])
+        block=tuple([512, 1, 1]),
+        args=[
+            cuda_int32(tenOut.shape[0] * tenOut.shape[2] * tenOut.shape[3]),
+            tenOne.data_ptr(),
+            tenTwo.data_ptr(),
+            tenOut.data_ptr(),
+        ],
+        stream=cuda_stream(),
+    )
 
 
 # end
 
 
-##########################################################
-
-
 class costvol_func(torch.autograd.Function):
     @staticmethod
-    @torch.cuda.amp.custom_fwd(cast_inputs=torch.float32)
+    @torch.cuda.amp.custom_fwd
     def forward(self, tenOne, tenTwo):
-        tenOut = tenOne.new_empty(
-            [tenOne.shape[0], 81, tenOne.shape[2], tenOne.shape[3]]
+        # the packed half2 kernel is only used for inference, training keeps float32
+        if (
+            tenOne.dtype == torch.float16
+            and tenOne.shape[1] % 2 == 0
+            and True not in self.needs_input_grad
+        ):
+            tenTwo = tenTwo.half()
+
+        elif True:
+            tenOne = tenOne.float()
+            tenTwo = tenTwo.float()
+
+        # end
+
+        # match the memory format of the features the cost volume is concatenated to
+        objFormat = torch.contiguous_format
+
+        if tenOne.is_contiguous(memory_format=torch.channels_last) == True:
+            objFormat = torch.channels_last
+        # end
+
+        tenOut = torch.empty(
+            [tenOne.shape[0], 81, tenOne.shape[2], tenOne.shape[3]],
+            dtype=tenOne.dtype,
+            device=tenOne.device,
+            memory_format=objFormat,
         )
 
-        cuda_launch(
-            cuda_kernel(
-                "costvol_out",
-                """
-            extern "C" __global__ void __launch_bounds__(512) costvol_out(
-                const int n,
-                const {{type}}* __restrict__ tenOne,
-                const {{type}}* __restrict__ tenTwo,
-                {{type}}* __restrict__ tenOut
-            ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
-                const int intN = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut) ) % SIZE_0(tenOut);
-                const int intC = -1;
-                const int intY = ( intIndex / SIZE_3(tenOut)                  ) % SIZE_2(tenOut);
-                const int intX = ( intIndex                                   ) % SIZE_3(tenOut);
+        costvol_out(tenOne, tenTwo, tenOut)
 
-                {{type}} fltOne[{{intChans}}];
+        self.save_for_backward(tenOne, tenTwo)
 
-                for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
-                    fltOne[intValue] = VALUE_4(tenOne, intN, intValue, intY, intX);
-                }
+        return tenOut
 
-                int intOffset = OFFSET_4(tenOut, intN, 0, intY, intX);
+    # end
 
-                for (int intOy = intY - 4; intOy <= intY + 4; intOy += 1) {
-                    for (int intOx = intX - 4; intOx <= intX + 4; intOx += 1) {
-                        {{type}} fltValue = 0.0f;
+    @staticmethod
+    @torch.cuda.amp.custom_bwd
+    def backward(self, tenOutgrad):
+        tenOne, tenTwo = self.saved_tensors
 
-                        if ((intOy >= 0) && (intOy < SIZE_2(tenOut)) && (intOx >= 0) && (intOx < SIZE_3(tenOut))) {
-                            for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
-                                fltValue += abs(fltOne[intValue] - VALUE_4(tenTwo, intN, intValue, intOy, intOx));
-                            }
-                        } else {
-                            for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
-                                fltValue += abs(fltOne[intValue]);
-                            }
-                        }
-
-                        tenOut[intOffset] = fltValue / SIZE_1(tenOne);
-                        intOffset += SIZE_2(tenOut) * SIZE_3(tenOut);
-                    }
-                }
-            } }
-        """,
-                {
-                    "intChans": tenOne.shape[1],
-                    "tenOne": tenOne,
-                    "tenTwo": tenTwo,
-                    "tenOut": tenOut,
-                },
-            )
-        )(
-            grid=tuple(
-                [
-                    int(
-                        (
-                            (tenOut.shape[0] * tenOut.shape[2] * tenOut.shape[3])
-                            + 512
-                            - 1
-                        )
-                        / 512
-                    ),
-                    1,
-                    1,
-                ]
-            ),
-            block=tuple([512, 1, 1]),
-            args=[
-                cuda_int32(tenOut.shape[0] * tenOut.shape[2] * tenOut.shape[3]),
-                tenOne.data_ptr(),
-                tenTwo.data_ptr(),
-                tenOut.data_ptr(),
-            ],
-            stream=collections.namedtuple("Stream", "ptr")(
-                torch.cuda.current_stream().cuda_stream
-            ),
-        )
-
-        self.save_for_backward(tenOne, tenTwo)
-
-        return tenOut
-
-    # end
-
-    @staticmethod
-    @torch.cuda.amp.custom_bwd
-    def backward(self, tenOutgrad):
-        tenOne, tenTwo = self.saved_tensors
-
-        tenOutgrad = tenOutgrad.contiguous()
-        assert tenOutgrad.is_cuda == True
+        tenOutgrad = tenOutgrad.contiguous()
+        assert tenOutgrad.is_cuda == True
 
         tenOnegrad = (
-            tenOne.new_zeros(
+            tenOne.new_empty(
                 [tenOne.shape[0], tenOne.shape[1], tenOne.shape[2], tenOne.shape[3]]
             )
             if self.needs_input_grad[0] == True
@@ -488,15 +674,18 @@ class costvol_func(torch.autograd.Function):
                     {{type}}* __restrict__ tenOnegrad,
                     {{type}}* __restrict__ tenTwograd
                 ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
-                    const int intN = ( intIndex / SIZE_3(tenOnegrad) / SIZE_2(tenOnegrad) ) % SIZE_0(tenOnegrad);
+                    const int intN = ( intIndex / SIZE_3(tenOnegrad) / SIZE_2(tenOnegrad) );
                     const int intC = -1;
                     const int intY = ( intIndex / SIZE_3(tenOnegrad)                      ) % SIZE_2(tenOnegrad);
                     const int intX = ( intIndex                                           ) % SIZE_3(tenOnegrad);
+                    const {{type}} fltScale = 1.0f / {{intChans}};
 
                     {{type}} fltOne[{{intChans}}];
+                    {{type}} fltOnegrad[{{intChans}}];
 
                     for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
                         fltOne[intValue] = VALUE_4(tenOne, intN, intValue, intY, intX);
+                        fltOnegrad[intValue] = 0.0f;
                     }
 
                     int intOffset = OFFSET_4(tenOutgrad, intN, 0, intY, intX);
@@ -506,17 +695,17 @@ class costvol_func(torch.autograd.Function):
                             if ((intOy >= 0) && (intOy < SIZE_2(tenOutgrad)) && (intOx >= 0) && (intOx < SIZE_3(tenOutgrad))) {
                                 for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
                                     if (fltOne[intValue] - VALUE_4(tenTwo, intN, intValue, intOy, intOx) >= 0.0f) {
-                                        tenOnegrad[OFFSET_4(tenOnegrad, intN, intValue, intY, intX)] += +tenOutgrad[intOffset] / SIZE_1(tenOne);
+                                        fltOnegrad[intValue] += +tenOutgrad[intOffset] * fltScale;
                                     } else {
-                                        tenOnegrad[OFFSET_4(tenOnegrad, intN, intValue, intY, intX)] += -tenOutgrad[intOffset] / SIZE_1(tenOne);
+                                        fltOnegrad[intValue] += -tenOutgrad[intOffset] * fltScale;
                                     }
                                 }
                             } else {
                                 for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
                                     if (fltOne[intValue] >= 0.0f) {
-                                        tenOnegrad[OFFSET_4(tenOnegrad, intN, intValue, intY, intX)] += +tenOutgrad[intOffset] / SIZE_1(tenOne);
+                                        fltOnegrad[intValue] += +tenOutgrad[intOffset] * fltScale;
                                     } else {
-                                        tenOnegrad[OFFSET_4(tenOnegrad, intN, intValue, intY, intX)] += -tenOutgrad[intOffset] / SIZE_1(tenOne);
+                                        fltOnegrad[intValue] += -tenOutgrad[intOffset] * fltScale;
                                     }
                                 }
                             }
@@ -524,6 +713,10 @@ class costvol_func(torch.autograd.Function):
                             intOffset += SIZE_2(tenOutgrad) * SIZE_3(tenOutgrad);
                         }
                     }
+
+                    for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
+                        tenOnegrad[OFFSET_4(tenOnegrad, intN, intValue, intY, intX)] = fltOnegrad[intValue];
+                    }
                 } }
             """,
                     {
@@ -565,9 +758,7 @@ class costvol_func(torch.autograd.Function):
                     tenOnegrad.data_ptr(),
                     tenTwograd.data_ptr(),
                 ],
-                stream=collections.namedtuple("Stream", "ptr")(
-                    torch.cuda.current_stream().cuda_stream
-                ),
+                stream=cuda_stream(),
             )
         # end
 
@@ -584,10 +775,11 @@ class costvol_func(torch.autograd.Function):
                     {{type}}* __restrict__ tenOnegrad,
                     {{type}}* __restrict__ tenTwograd
                 ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
-                    const int intN = ( intIndex / SIZE_3(tenTwograd) / SIZE_2(tenTwograd) ) % SIZE_0(tenTwograd);
+                    const int intN = ( intIndex / SIZE_3(tenTwograd) / SIZE_2(tenTwograd) );
                     const int intC = -1;
                     const int intY = ( intIndex / SIZE_3(tenTwograd)                      ) % SIZE_2(tenTwograd);
                     const int intX = ( intIndex                                           ) % SIZE_3(tenTwograd);
+                    const {{type}} fltScale = 1.0f / {{intChans}};
 
                     {{type}} fltOne[{{intChans}}];
 
@@ -602,9 +794,9 @@ class costvol_func(torch.autograd.Function):
                             if ((intOy >= 0) && (intOy < SIZE_2(tenOutgrad)) && (intOx >= 0) && (intOx < SIZE_3(tenOutgrad))) {
                                 for (int intValue = 0; intValue < SIZE_1(tenOne); intValue += 1) {
                                     if (fltOne[intValue] - VALUE_4(tenTwo, intN, intValue, intOy, intOx) >= 0.0f) {
-                                        atomicAdd(&tenTwograd[OFFSET_4(tenTwograd, intN, intValue, intOy, intOx)], -tenOutgrad[intOffset] / SIZE_1(tenOne));
+                                        atomicAdd(&tenTwograd[OFFSET_4(tenTwograd, intN, intValue, intOy, intOx)], -tenOutgrad[intOffset] * fltScale);
                                     } else {
-                                        atomicAdd(&tenTwograd[OFFSET_4(tenTwograd, intN, intValue, intOy, intOx)], +tenOutgrad[intOffset] / SIZE_1(tenOne));
+                                        atomicAdd(&tenTwograd[OFFSET_4(tenTwograd, intN, intValue, intOy, intOx)], +tenOutgrad[intOffset] * fltScale);
                                     }
                                 }
                             } else {
@@ -655,9 +847,7 @@ class costvol_func(torch.autograd.Function):
                     tenOnegrad.data_ptr(),
                     tenTwograd.data_ptr(),
                 ],
-                stream=collections.namedtuple("Stream", "ptr")(
-                    torch.cuda.current_stream().cuda_stream
-                ),
+                stream=cuda_stream(),
             )
         # end
 
@@ -672,6 +862,28 @@ class costvol_func(torch.autograd.Function):
 ##########################################################
 
 
+class Down(torch.nn.Module):
+    def __init__(self, fltScale):
+        super().__init__()
+
+        self.fltScale = fltScale
+
+    # end
+
+    def forward(self, tenIn: torch.Tensor) -> torch.Tensor:
+        return torch.nn.functional.interpolate(
+            input=tenIn,
+            scale_factor=self.fltScale,
+            mode="bilinear",
+            align_corners=False,
+        )
+
+    # end
+
+
+# end
+
+
 class Basic(torch.nn.Module):
     def __init__(
         self,
@@ -692,8 +904,27 @@ class Basic(torch.nn.Module):
         intChans = intChans.copy()
         fltStride = 1.0
 
-        for intPart, strPart in enumerate(self.strType.split("+")[0].split("-")):
-            if strPart.startswith("evenize") == True and intPart == 0:
+        strParts = self.strType.split("+")
+        objOptions = set(strParts[1:])
+        boolBias = "nobias" not in objOptions
+
+        # parse every token once into its name and its arguments
+        objTokens = []
+
+        for strPart in strParts[0].split("-"):
+            strName, _, strRest = strPart.partition("(")
+
+            if strRest == "":
+                objTokens.append((strName, []))
+
+            elif strRest != "":
+                objTokens.append((strName, strRest.rstrip(")").split(",")))
+
+            # end
+        # end
+
+        for intPart, (strName, strArgs) in enumerate(objTokens):
+            if strName == "evenize" and intPart == 0:
 
                 class Evenize(torch.nn.Module):
                     def __init__(self, strPad):
@@ -730,31 +961,31 @@ class Basic(torch.nn.Module):
 
                 strPad = "zeros"
 
-                if "(" in strPart:
-                    if "replpad" in strPart.split("(")[1].split(")")[0].split(","):
+                if len(strArgs) > 0:
+                    if "replpad" in strArgs:
                         strPad = "replicate"
-                    if "reflpad" in strPart.split("(")[1].split(")")[0].split(","):
+                    if "reflpad" in strArgs:
                         strPad = "reflect"
                 # end
 
                 self.netEvenize = Evenize(strPad)
 
-            elif strPart.startswith("conv") == True:
+            elif strName == "conv":
                 intKsize = 3
                 intPad = 1
                 strPad = "zeros"
 
-                if "(" in strPart:
-                    intKsize = int(strPart.split("(")[1].split(")")[0].split(",")[0])
+                if len(strArgs) > 0:
+                    intKsize = int(strArgs[0])
                     intPad = int(math.floor(0.5 * (intKsize - 1)))
 
-                    if "replpad" in strPart.split("(")[1].split(")")[0].split(","):
+                    if "replpad" in strArgs:
                         strPad = "replicate"
-                    if "reflpad" in strPart.split("(")[1].split(")")[0].split(","):
+                    if "reflpad" in strArgs:
                         strPad = "reflect"
                 # end
 
-                if "nopad" in self.strType.split("+"):
+                if "nopad" in objOptions:
                     intPad = 0
                 # end
 
@@ -766,28 +997,28 @@ class Basic(torch.nn.Module):
                         stride=1,
                         padding=intPad,
                         padding_mode=strPad,
-                        bias="nobias" not in self.strType.split("+"),
+                        bias=boolBias,
                     )
                 ]
                 intChans = intChans[1:]
                 fltStride *= 1.0
 
-            elif strPart.startswith("sconv") == True:
+            elif strName == "sconv":
                 intKsize = 3
                 intPad = 1
                 strPad = "zeros"
 
-                if "(" in strPart:
-                    intKsize = int(strPart.split("(")[1].split(")")[0].split(",")[0])
+                if len(strArgs) > 0:
+                    intKsize = int(strArgs[0])
                     intPad = int(math.floor(0.5 * (intKsize - 1)))
 
-                    if "replpad" in strPart.split("(")[1].split(")")[0].split(","):
+                    if "replpad" in strArgs:
                         strPad = "replicate"
-                    if "reflpad" in strPart.split("(")[1].split(")")[0].split(","):
+                    if "reflpad" in strArgs:
                         strPad = "reflect"
                 # end
 
-                if "nopad" in self.strType.split("+"):
+                if "nopad" in objOptions:
                     intPad = 0
                 # end
 
@@ -799,74 +1030,62 @@ class Basic(torch.nn.Module):
                         stride=2,
                         padding=intPad,
                         padding_mode=strPad,
-                        bias="nobias" not in self.strType.split("+"),
+                        bias=boolBias,
                     )
                 ]
                 intChans = intChans[1:]
                 fltStride *= 2.0
 
-            elif strPart.startswith("up") == True:
+            elif strName == "up":
+                strType = "bilinear"
 
-                class Up(torch.nn.Module):
-                    def __init__(self, strType):
-                        super().__init__()
+                if len(strArgs) > 0:
+                    if "nearest" in strArgs:
+                        strType = "nearest"
+                    if "pyramid" in strArgs:
+                        strType = "pyramid"
+                    if "shuffle" in strArgs:
+                        strType = "shuffle"
+                # end
 
-                        self.strType = strType
+                if strType == "nearest":
+                    netMain += [
+                        torch.nn.Upsample(scale_factor=2.0, mode="nearest-exact")
+                    ]
 
-                    # end
+                elif strType == "bilinear":
+                    netMain += [
+                        torch.nn.Upsample(
+                            scale_factor=2.0, mode="bilinear", align_corners=False
+                        )
+                    ]
 
-                    def forward(self, tenIn: torch.Tensor) -> torch.Tensor:
-                        if self.strType == "nearest":
-                            return torch.nn.functional.interpolate(
-                                input=tenIn,
-                                scale_factor=2.0,
-                                mode="nearest-exact",
-                                align_corners=False,
-                            )
+                elif strType == "pyramid":
 
-                        elif self.strType == "bilinear":
-                            return torch.nn.functional.interpolate(
-                                input=tenIn,
-                                scale_factor=2.0,
-                                mode="bilinear",
-                                align_corners=False,
-                            )
-
-                        elif self.strType == "pyramid":
+                    class Up(torch.nn.Module):
+                        def forward(self, tenIn: torch.Tensor) -> torch.Tensor:
                             return pyramid(tenIn, None, "up")
 
-                        elif self.strType == "shuffle":
-                            return torch.nn.functional.pixel_shuffle(
-                                tenIn, upscale_factor=2
-                            )  # https://github.com/pytorch/pytorch/issues/62854
-
                         # end
 
-                        assert False  # to make torchscript happy
-
                     # end
 
-                # end
+                    netMain += [Up()]
 
-                strType = "bilinear"
+                elif strType == "shuffle":
+                    netMain += [
+                        torch.nn.PixelShuffle(upscale_factor=2)
+                    ]  # https://github.com/pytorch/pytorch/issues/62854
 
-                if "(" in strPart:
-                    if "nearest" in strPart.split("(")[1].split(")")[0].split(","):
-                        strType = "nearest"
-                    if "pyramid" in strPart.split("(")[1].split(")")[0].split(","):
-                        strType = "pyramid"
-                    if "shuffle" in strPart.split("(")[1].split(")")[0].split(","):
-                        strType = "shuffle"
                 # end
 
-                netMain += [Up(strType)]
                 fltStride *= 0.5
 
-            elif strPart.startswith("prelu") == True:
+            elif strName == "prelu":
                 netMain += [
                     torch.nn.PReLU(
                         num_parameters=1,
-                        init=float(strPart.split("(")[1].split(")")[0].split(",")[0]),
+                        init=float(strArgs[0]),
                     )
                 ]
                 fltStride *= 1.0
@@ -877,9 +1096,9 @@ class Basic(torch.nn.Module):
             # end
         # end
 
-        self.netMain = torch.nn.Sequential(*netMain)
+        self.netMain = torch.nn.ModuleList(netMain)
 
-        for strPart in self.strType.split("+")[1:]:
+        for strPart in strParts[1:]:
             if strPart.startswith("skip") == True:
                 if intIn == intOut and fltStride == 1.0:
                     self.netShortcut = torch.nn.Identity()
@@ -891,55 +1110,13 @@ class Basic(torch.nn.Module):
                         kernel_size=1,
                         stride=1,
                         padding=0,
-                        bias="nobias" not in self.strType.split("+"),
+                        bias=boolBias,
                     )
 
                 elif intIn == intOut and fltStride != 1.0:
-
-                    class Down(torch.nn.Module):
-                        def __init__(self, fltScale):
-                            super().__init__()
-
-                            self.fltScale = fltScale
-
-                        # end
-
-                        def forward(self, tenIn: torch.Tensor) -> torch.Tensor:
-                            return torch.nn.functional.interpolate(
-                                input=tenIn,
-                                scale_factor=self.fltScale,
-                                mode="bilinear",
-                                align_corners=False,
-                            )
-
-                        # end
-
-                    # end
-
                     self.netShortcut = Down(1.0 / fltStride)
 
                 elif intIn != intOut and fltStride != 1.0:
-
-                    class Down(torch.nn.Module):
-                        def __init__(self, fltScale):
-                            super().__init__()
-
-                            self.fltScale = fltScale
-
-                        # end
-
-                        def forward(self, tenIn: torch.Tensor) -> torch.Tensor:
-                            return torch.nn.functional.interpolate(
-                                input=tenIn,
-                                scale_factor=self.fltScale,
-                                mode="bilinear",
-                                align_corners=False,
-                            )
-
-                        # end
-
-                    # end
-
                     self.netShortcut = torch.nn.Sequential(
                         Down(1.0 / fltStride),
                         torch.nn.Conv2d(
@@ -948,7 +1125,7 @@ class Basic(torch.nn.Module):
                             kernel_size=1,
                             stride=1,
                             padding=0,
-                            bias="nobias" not in self.strType.split("+"),
+                            bias=boolBias,
                         ),
                     )
 
@@ -969,7 +1146,11 @@ class Basic(torch.nn.Module):
             tenIn = self.netEvenize(tenIn)
         # end
 
-        tenOut = self.netMain(tenIn)
+        tenOut = tenIn
+
+        for netLayer in self.netMain:
+            tenOut = netLayer(tenOut)
+        # end
 
         if self.netShortcut is not None:
             tenOut = tenOut + self.netShortcut(tenIn)
@@ -987,9 +1168,13 @@ class Basic(torch.nn.Module):
 
 
 class Network(torch.nn.Module):
-    def __init__(self):
+    def __init__(self, boolGraph=False):
         super().__init__()
 
+        self.boolGraph = boolGraph
+        self.objGraphs = {}
+        self.objStreams = None
+
         class Extractor(torch.nn.Module):
             def __init__(self):
                 super().__init__()
@@ -1020,7 +1205,7 @@ class Network(torch.nn.Module):
                     input=tenThr, kernel_size=2, stride=2, count_include_pad=False
                 )
                 tenFiv = torch.nn.functional.avg_pool2d(
-                    input=tenFou, kernel_size=2, stride=2, count_include_pad=False
+                    input=tenThr, kernel_size=4, stride=4, count_include_pad=False
                 )
 
                 return [tenOne, tenTwo, tenThr, tenFou, tenFiv]
@@ -1044,36 +1229,71 @@ class Network(torch.nn.Module):
 
             def forward(self, tenOne, tenTwo, tenFlow):
                 if tenFlow is not None:
-                    tenFlow = 2.0 * torch.nn.functional.interpolate(
+                    tenFlow = torch.nn.functional.interpolate(
                         input=tenFlow,
                         scale_factor=2.0,
                         mode="bilinear",
                         align_corners=False,
-                    )
-                # end
+                    ).mul_(2.0)
 
-                tenMain = []
+                    tenWarp = tenFlow
 
-                if tenFlow is None:
+                    if torch.is_grad_enabled() == True:
+                        tenWarp = tenFlow.detach()
+                    # end
+
+                    tenTwo = backwarp(tenTwo, tenWarp)
+                # end
+
+                if torch.is_grad_enabled() == True:
+                    tenMain = []
                     tenMain.append(tenOne)
                     tenMain.append(self.netCostacti(costvol_func.apply(tenOne, tenTwo)))
 
-                elif tenFlow is not None:
-                    tenMain.append(tenOne)
-                    tenMain.append(
-                        self.netCostacti(
-                            costvol_func.apply(
-                                tenOne, backwarp(tenTwo, tenFlow.detach())
-                            )
-                        )
+                    if tenFlow is not None:
+                        tenMain.append(tenFlow)
+                    # end
+
+                    tenMain = torch.cat(tenMain, 1)
+
+                elif torch.is_grad_enabled() == False:
+                    # the cost volume is non-negative so the prelu is the identity on it, which
+                    # allows writing it straight into the decoder input instead of concatenating
+                    intChans = tenOne.shape[1]
+                    objDtype = torch.float32
+                    objFormat = torch.contiguous_format
+
+                    if tenOne.dtype == torch.float16 and intChans % 2 == 0:
+                        objDtype = torch.float16
+                    # end
+
+                    if tenOne.is_contiguous(memory_format=torch.channels_last) == True:
+                        objFormat = torch.channels_last
+                    # end
+
+                    tenMain = torch.empty(
+                        [
+                            tenOne.shape[0],
+                            intChans + 81 + (2 if tenFlow is not None else 0),
+                            tenOne.shape[2],
+                            tenOne.shape[3],
+                        ],
+                        dtype=objDtype,
+                        device=tenOne.device,
+                        memory_format=objFormat,
                     )
-                    tenMain.append(tenFlow)
+
+                    tenMain[:, :intChans].copy_(tenOne)
+
+                    costvol_out(tenOne, tenTwo, tenMain[:, intChans : intChans + 81])
+
+                    if tenFlow is not None:
+                        tenMain[:, intChans + 81 :].copy_(tenFlow)
+                    # end
 
                 # end
 
-                return (tenFlow if tenFlow is not None else 0.0) + self.netMain(
-                    torch.cat(tenMain, 1)
-                )
+                return (tenFlow if tenFlow is not None else 0.0) + self.netMain(tenMain)
 
             # end
 
@@ -1087,358 +1307,482 @@ class Network(torch.nn.Module):
         self.netTwo = Decoder(32 + 81 + 2)
         self.netOne = Decoder(32 + 81 + 2)
 
+        self.to(memory_format=torch.channels_last)
+
     # end
 
-    def bidir(self, tenOne, tenTwo):
-        tenOne, tenTwo = list(
-            zip(
-                *[
-                    torch.split(tenFeat, [tenOne.shape[0], tenTwo.shape[0]], 0)
-                    for tenFeat in self.netExtractor(torch.cat([tenOne, tenTwo], 0))
-                ]
-            )
-        )
+    def freeze_prelu(self):
+        # inference only, the trained slopes become constants of in-place leaky relus so the
+        # module can no longer be fine-tuned afterwards, only the prelus in netMain are swapped
+        # since each of them follows a convolution it can be fused into, Decoder.netCostacti on
+        # the cost volume is left as it is
+        assert self.training == False
+
+        for strName, netModule in list(self.named_modules()):
+            if isinstance(netModule, torch.nn.PReLU) == True and "netMain" in strName:
+                if netModule.weight.numel() == 1:
+                    strParent, _, strChild = strName.rpartition(".")
+
+                    setattr(
+                        self.get_submodule(strParent),
+                        strChild,
+                        torch.nn.LeakyReLU(
+                            negative_slope=float(netModule.weight.item()), inplace=True
+                        ),
+                    )
+                # end
+            # end
+        # end
 
-        tenFwd = None
-        tenFwd = self.netFiv(tenOne[-1], tenTwo[-1], tenFwd)
-        tenFwd = self.netFou(tenOne[-2], tenTwo[-2], tenFwd)
-        tenFwd = self.netThr(tenOne[-3], tenTwo[-3], tenFwd)
-        tenFwd = self.netTwo(tenOne[-4], tenTwo[-4], tenFwd)
-        tenFwd = self.netOne(tenOne[-5], tenTwo[-5], tenFwd)
+    # end
 
-        tenBwd = None
-        tenBwd = self.netFiv(tenTwo[-1], tenOne[-1], tenBwd)
-        tenBwd = self.netFou(tenTwo[-2], tenOne[-2], tenBwd)
-        tenBwd = self.netThr(tenTwo[-3], tenOne[-3], tenBwd)
-        tenBwd = self.netTwo(tenTwo[-4], tenOne[-4], tenBwd)
-        tenBwd = self.netOne(tenTwo[-5], tenOne[-5], tenBwd)
+    def bidir(self, tenOne, tenTwo, boolGraph=True):
+        tenOne = tenOne.contiguous(memory_format=torch.channels_last)
+        tenTwo = tenTwo.contiguous(memory_format=torch.channels_last)
+
+        # replay a captured cuda graph per input shape, eager otherwise or when already inside a capture,
+        # boolGraph=False is for callers that are themselves captured (including their warmup passes)
+        if (
+            self.boolGraph == True
+            and boolGraph == True
+            and torch.is_grad_enabled() == False
+            and tenOne.is_cuda == True
+            and torch.cuda.is_current_stream_capturing() == False
+        ):
+            return tuple(cuda_graph(self.objGraphs, self.bidir_eager, [tenOne, tenTwo]))
+        # end
 
-        return tenFwd, tenBwd
+        return self.bidir_eager(tenOne, tenTwo)
 
     # end
 
+    def bidir_eager(self, tenOne, tenTwo):
+        tenOne = self.netExtractor(tenOne)
+        tenTwo = self.netExtractor(tenTwo)
 
-# end
-
+        if tenOne[0].is_cuda == False:
+            return self.decode(tenOne, tenTwo), self.decode(tenTwo, tenOne)
+        # end
 
-##########################################################
+        # the forward and the backward decoding are independent, run them on two streams
+        if self.objStreams is None:
+            self.objStreams = [torch.cuda.Stream(), torch.cuda.Stream()]
+        # end
 
+        objMain = torch.cuda.current_stream()
 
-objCudacache = {}
+        for objSide in self.objStreams:
+            objSide.wait_stream(objMain)
 
+            for tenFeat in tenOne + tenTwo:
+                tenFeat.record_stream(objSide)
+            # end
+        # end
 
-def cuda_int32(intIn: int):
-    return cupy.int32(intIn)
+        with torch.cuda.stream(self.objStreams[0]):
+            tenFwd = self.decode(tenOne, tenTwo)
+        # end
 
+        with torch.cuda.stream(self.objStreams[1]):
+            tenBwd = self.decode(tenTwo, tenOne)
+        # end
 
-# end
+        for objSide in self.objStreams:
+            objMain.wait_stream(objSide)
+        # end
 
+        tenFwd.record_stream(objMain)
+        tenBwd.record_stream(objMain)
 
-def cuda_float32(fltIn: float):
-    return cupy.float32(fltIn)
+        return tenFwd, tenBwd
 
+    # end
 
-# end
+    def decode(self, tenOne, tenTwo):
+        tenFlow = None
+        tenFlow = self.netFiv(tenOne[-1], tenTwo[-1], tenFlow)
+        tenFlow = self.netFou(tenOne[-2], tenTwo[-2], tenFlow)
+        tenFlow = self.netThr(tenOne[-3], tenTwo[-3], tenFlow)
+        tenFlow = self.netTwo(tenOne[-4], tenTwo[-4], tenFlow)
+        tenFlow = self.netOne(tenOne[-5], tenTwo[-5], tenFlow)
 
+        return tenFlow
 
-def cuda_kernel(strFunction: str, strKernel: str, objVariables: typing.Dict):
-    if "device" not in objCudacache:
-        objCudacache["device"] = torch.cuda.get_device_name()
     # end
 
-    strKey = strFunction
 
-    for strVariable in objVariables:
-        objValue = objVariables[strVariable]
+# end
 
-        strKey += strVariable
 
-        if objValue is None:
-            continue
+##########################################################
 
-        elif type(objValue) == int:
-            strKey += str(objValue)
 
-        elif type(objValue) == float:
-            strKey += str(objValue)
+def softsplat(
+    tenIn: torch.Tensor, tenFlow: torch.Tensor, tenMetric: torch.Tensor, strMode: str
+):
+    assert strMode.split("-")[0] in ["sum", "avg", "linear", "soft"]
 
-        elif type(objValue) == bool:
-            strKey += str(objValue)
+    if strMode == "sum":
+        assert tenMetric is None
+    if strMode == "avg":
+        assert tenMetric is None
+    if strMode.split("-")[0] == "linear":
+        assert tenMetric is not None
+    if strMode.split("-")[0] == "soft":
+        assert tenMetric is not None
 
-        elif type(objValue) == str:
-            strKey += objValue
+    if strMode == "avg":
+        tenIn = torch.cat(
+            [
+                tenIn,
+                tenIn.new_ones([tenIn.shape[0], 1, tenIn.shape[2], tenIn.shape[3]]),
+            ],
+            1,
+        )
 
-        elif type(objValue) == torch.Tensor:
-            strKey += str(objValue.dtype)
-            strKey += str(objValue.shape)
-            strKey += str(objValue.stride())
+    elif strMode.split("-")[0] == "linear":
+        tenIn = torch.cat([tenIn * tenMetric, tenMetric], 1)
 
-        elif True:
-            print(strVariable, type(objValue))
-            assert False
+    elif strMode.split("-")[0] == "soft":
+        tenIn = torch.cat([tenIn * tenMetric.exp(), tenMetric.exp()], 1)
 
-        # end
     # end
 
-    strKey += objCudacache["device"]
-
-    if strKey not in objCudacache:
-        for strVariable in objVariables:
-            objValue = objVariables[strVariable]
-
-            if objValue is None:
-                continue
+    tenOut = softsplat_func.apply(tenIn, tenFlow)
 
-            elif type(objValue) == int:
-                strKernel = strKernel.replace("{{" + strVariable + "}}", str(objValue))
+    if strMode.split("-")[0] in ["avg", "linear", "soft"]:
+        tenNormalize = tenOut[:, -1:, :, :]
 
-            elif type(objValue) == float:
-                strKernel = strKernel.replace("{{" + strVariable + "}}", str(objValue))
+        if len(strMode.split("-")) == 1:
+            tenNormalize = tenNormalize + 0.0000001
 
-            elif type(objValue) == bool:
-                strKernel = strKernel.replace("{{" + strVariable + "}}", str(objValue))
+        elif strMode.split("-")[1] == "addeps":
+            tenNormalize = tenNormalize + 0.0000001
 
-            elif type(objValue) == str:
-                strKernel = strKernel.replace("{{" + strVariable + "}}", objValue)
+        elif strMode.split("-")[1] == "zeroeps":
+            tenNormalize[tenNormalize == 0.0] = 1.0
 
-            elif type(objValue) == torch.Tensor and objValue.dtype == torch.uint8:
-                strKernel = strKernel.replace("{{type}}", "unsigned char")
+        elif strMode.split("-")[1] == "clipeps":
+            tenNormalize = tenNormalize.clip(0.0000001, None)
 
-            elif type(objValue) == torch.Tensor and objValue.dtype == torch.float16:
-                strKernel = strKernel.replace("{{type}}", "half")
+        # end
 
-            elif type(objValue) == torch.Tensor and objValue.dtype == torch.float32:
-                strKernel = strKernel.replace("{{type}}", "float")
+        tenOut = tenOut[:, :-1, :, :] / tenNormalize
+    # end
 
-            elif type(objValue) == torch.Tensor and objValue.dtype == torch.float64:
-                strKernel = strKernel.replace("{{type}}", "double")
+    return tenOut
 
-            elif type(objValue) == torch.Tensor and objValue.dtype == torch.int32:
-                strKernel = strKernel.replace("{{type}}", "int")
 
-            elif type(objValue) == torch.Tensor and objValue.dtype == torch.int64:
-                strKernel = strKernel.replace("{{type}}", "long")
+# end
 
-            elif type(objValue) == torch.Tensor:
-                print(strVariable, objValue.dtype)
-                assert False
 
-            elif True:
-                print(strVariable, type(objValue))
-                assert False
+def softsplat_flowpair(tenFlow: torch.Tensor):
+    # whether both flow components of a pixel can be fetched with a single float2 load
+    return int(
+        tenFlow.dtype == torch.float32
+        and tenFlow.stride(1) == 1
+        and tenFlow.stride(0) % 2 == 0
+        and tenFlow.stride(2) % 2 == 0
+        and tenFlow.stride(3) % 2 == 0
+        and tenFlow.data_ptr() % 8 == 0
+    )
 
-            # end
-        # end
 
-        while True:
-            objMatch = re.search("(SIZE_)([0-4])(\()([^\)]*)(\))", strKernel)
+# end
 
-            if objMatch is None:
-                break
-            # end
 
-            intArg = int(objMatch.group(2))
+def softsplat_out(tenIn: torch.Tensor, tenFlow: torch.Tensor, tenOut: torch.Tensor):
+    # tenOut is accumulated into and not cleared, so several splats can share one buffer, it may
+    # also have a smaller batch than tenIn in which case sample n is added into n % tenOut.shape[0]
+    assert tenOut.dtype == torch.float32
+    assert tenIn.shape[0] % tenOut.shape[0] == 0
 
-            strTensor = objMatch.group(4)
-            intSizes = objVariables[strTensor].size()
+    tenFlow = tenFlow.to(tenIn.dtype)
 
-            strKernel = strKernel.replace(
-                objMatch.group(),
-                str(
-                    intSizes[intArg]
-                    if torch.is_tensor(intSizes[intArg]) == False
-                    else intSizes[intArg].item()
-                ),
-            )
-        # end
+    if tenIn.is_cuda == True:
+        cuda_launch(
+            cuda_kernel(
+                "softsplat_out",
+                """
+            #include <cuda_fp16.h>
 
-        while True:
-            objMatch = re.search("(OFFSET_)([0-4])(\()", strKernel)
+            __device__ __forceinline__ void softsplat_atomic(float* __restrict__ tenOut, const int intOffset, const float fltValue, const bool boolActive) {
+                // lanes of a warp that hit the same element are summed first so that only one of them issues the atomic,
+                // every lane of the warp has to make this call and boolActive says whether it contributes
 
-            if objMatch is None:
-                break
-            # end
+                #if __CUDA_ARCH__ >= 700
+                    const unsigned int intParticipating = __ballot_sync(0xffffffff, boolActive);
 
-            intStart = objMatch.span()[1]
-            intStop = objMatch.span()[1]
-            intParentheses = 1
+                    if (boolActive == true) {
+                        const unsigned int intSame = __match_any_sync(intParticipating, intOffset);
+                        const int intLane = ((threadIdx.y * blockDim.x) + threadIdx.x) & 31;
 
-            while True:
-                intParentheses += 1 if strKernel[intStop] == "(" else 0
-                intParentheses -= 1 if strKernel[intStop] == ")" else 0
-
-                if intParentheses == 0:
-                    break
-                # end
+                        float fltSum = 0.0f;
 
-                intStop += 1
-            # end
+                        for (unsigned int intRemaining = intSame; intRemaining != 0; intRemaining &= intRemaining - 1) {
+                            fltSum += __shfl_sync(intSame, fltValue, __ffs(intRemaining) - 1);
+                        }
 
-            intArgs = int(objMatch.group(2))
-            strArgs = strKernel[intStart:intStop].split(",")
+                        if (intLane == __ffs(intSame) - 1) {
+                            atomicAdd(&tenOut[intOffset], fltSum);
+                        }
+                    }
+                #else
+                    if (boolActive == true) {
+                        atomicAdd(&tenOut[intOffset], fltValue);
+                    }
+                #endif
+            }
 
-            assert intArgs == len(strArgs) - 1
+            extern "C" __global__ void __launch_bounds__(256) softsplat_out(
+                const int n,
+                const {{type}}* __restrict__ tenIn,
+                const {{type}}* __restrict__ tenFlow,
+                float* __restrict__ tenOut
+            ) {
+                // the inputs may be half for inference, the accumulation is always done in float
 
-            strTensor = strArgs[0]
-            intStrides = objVariables[strTensor].stride()
+                // each 16x16 block first accumulates into an 18x18 shared tile that follows the flow of its first pixel
 
-            strIndex = []
+                __shared__ float fltTile[18][18];
+                __shared__ int intAnchor[2];
 
-            for intArg in range(intArgs):
-                strIndex.append(
-                    "(("
-                    + strArgs[intArg + 1].replace("{", "(").replace("}", ")").strip()
-                    + ")*"
-                    + str(
-                        intStrides[intArg]
-                        if torch.is_tensor(intStrides[intArg]) == False
-                        else intStrides[intArg].item()
-                    )
-                    + ")"
-                )
-            # end
-
-            strKernel = strKernel.replace(
-                "OFFSET_" + str(intArgs) + "(" + strKernel[intStart:intStop] + ")",
-                "(" + str.join("+", strIndex) + ")",
-            )
-        # end
+                const int intN = blockIdx.z;
+                const int intOutN = intN % SIZE_0(tenOut);
+                const int intC = -1;
+                const int intY = (blockIdx.y * 16) + threadIdx.y;
+                const int intX = (blockIdx.x * 16) + threadIdx.x;
+                const int intThread = (threadIdx.y * 16) + threadIdx.x;
 
-        while True:
-            objMatch = re.search("(VALUE_)([0-4])(\()", strKernel)
+                assert(SIZE_1(tenFlow) == 2);
 
-            if objMatch is None:
-                break
-            # end
+                if (intThread == 0) {
+                    float fltShiftX = (float) (LDG_4(tenFlow, intN, 0, intY, intX));
+                    float fltShiftY = (float) (LDG_4(tenFlow, intN, 1, intY, intX));
 
-            intStart = objMatch.span()[1]
-            intStop = objMatch.span()[1]
-            intParentheses = 1
+                    intAnchor[0] = intY - 1 + (((isfinite(fltShiftY) == true) && (fabs(fltShiftY) < SIZE_2(tenOut))) ? (int) (floor(fltShiftY)) : 0);
+                    intAnchor[1] = intX - 1 + (((isfinite(fltShiftX) == true) && (fabs(fltShiftX) < SIZE_3(tenOut))) ? (int) (floor(fltShiftX)) : 0);
+                }
 
-            while True:
-                intParentheses += 1 if strKernel[intStop] == "(" else 0
-                intParentheses -= 1 if strKernel[intStop] == ")" else 0
+                __syncthreads();
 
-                if intParentheses == 0:
-                    break
-                # end
+                const int intAnchorY = intAnchor[0];
+                const int intAnchorX = intAnchor[1];
 
-                intStop += 1
-            # end
+                bool boolValid = (intY < SIZE_2(tenOut)) && (intX < SIZE_3(tenOut));
 
-            intArgs = int(objMatch.group(2))
-            strArgs = strKernel[intStart:intStop].split(",")
+                float fltX = -2.0f;
+                float fltY = -2.0f;
 
-            assert intArgs == len(strArgs) - 1
+                if (boolValid == true) {
+                    #if {{intFlowpair}} == 1
+                        const float2 fltFlow = __ldg((const float2*) (&tenFlow[OFFSET_4(tenFlow, intN, 0, intY, intX)]));
 
-            strTensor = strArgs[0]
-            intStrides = objVariables[strTensor].stride()
+                        fltX = (float) (intX) + fltFlow.x;
+                        fltY = (float) (intY) + fltFlow.y;
+                    #else
+                        fltX = (float) (intX) + (float) (LDG_4(tenFlow, intN, 0, intY, intX));
+                        fltY = (float) (intY) + (float) (LDG_4(tenFlow, intN, 1, intY, intX));
+                    #endif
 
-            strIndex = []
+                    if ((isfinite(fltX) == false) || (isfinite(fltY) == false)) {
+                        boolValid = false;
+                        fltX = -2.0f;
+                        fltY = -2.0f;
+                    }
+                }
 
-            for intArg in range(intArgs):
-                strIndex.append(
-                    "(("
-                    + strArgs[intArg + 1].replace("{", "(").replace("}", ")").strip()
-                    + ")*"
-                    + str(
-                        intStrides[intArg]
-                        if torch.is_tensor(intStrides[intArg]) == False
-                        else intStrides[intArg].item()
-                    )
-                    + ")"
-                )
-            # end
+                int intNorthwestX = (int) (floor(fltX));
+                int intNorthwestY = (int) (floor(fltY));
+                int intNortheastX = intNorthwestX + 1;
+                int intNortheastY = intNorthwestY;
+                int intSouthwestX = intNorthwestX;
+                int intSouthwestY = intNorthwestY + 1;
+                int intSoutheastX = intNorthwestX + 1;
+                int intSoutheastY = intNorthwestY + 1;
+
+                float fltFracX = fltX - (float) (intNorthwestX);
+                float fltFracY = fltY - (float) (intNorthwestY);
+
+                float fltNorthwest = (1.0f - fltFracX) * (1.0f - fltFracY);
+                float fltNortheast = fltFracX * (1.0f - fltFracY);
+                float fltSouthwest = (1.0f - fltFracX) * fltFracY;
+                float fltSoutheast = fltFracX * fltFracY;
+
+                // the corners share their rows and columns, so the bounds are checked once per row and column
+                const bool boolWest = (intNorthwestX >= 0) && (intNorthwestX < SIZE_3(tenOut));
+                const bool boolEast = (intNortheastX >= 0) && (intNortheastX < SIZE_3(tenOut));
+                const bool boolNorth = (intNorthwestY >= 0) && (intNorthwestY < SIZE_2(tenOut));
+                const bool boolSouth = (intSouthwestY >= 0) && (intSouthwestY < SIZE_2(tenOut));
+
+                const bool boolNorthwest = boolNorth && boolWest;
+                const bool boolNortheast = boolNorth && boolEast;
+                const bool boolSouthwest = boolSouth && boolWest;
+                const bool boolSoutheast = boolSouth && boolEast;
+
+                const int intTileY = intNorthwestY - intAnchorY;
+                const int intTileX = intNorthwestX - intAnchorX;
+
+                const bool boolTileWest = (intTileX >= 0) && (intTileX < 18);
+                const bool boolTileEast = (intTileX + 1 >= 0) && (intTileX + 1 < 18);
+                const bool boolTileNorth = (intTileY >= 0) && (intTileY < 18);
+                const bool boolTileSouth = (intTileY + 1 >= 0) && (intTileY + 1 < 18);
+
+                const bool boolTileNorthwest = boolTileNorth && boolTileWest;
+                const bool boolTileNortheast = boolTileNorth && boolTileEast;
+                const bool boolTileSouthwest = boolTileSouth && boolTileWest;
+                const bool boolTileSoutheast = boolTileSouth && boolTileEast;
+
+                for (int intChannel = 0; intChannel < {{intChans}}; intChannel += 1) {
+                    for (int intShared = intThread; intShared < 18 * 18; intShared += 256) {
+                        fltTile[intShared / 18][intShared % 18] = 0.0f;
+                    }
 
-            strKernel = strKernel.replace(
-                "VALUE_" + str(intArgs) + "(" + strKernel[intStart:intStop] + ")",
-                strTensor + "[" + str.join("+", strIndex) + "]",
-            )
-        # end
+                    __syncthreads();
 
-        objCudacache[strKey] = {"strFunction": strFunction, "strKernel": strKernel}
-    # end
+                    float fltIn = 0.0f;
 
-    return strKey
+                    if (boolValid == true) {
+                        fltIn = (float) (LDG_4(tenIn, intN, intChannel, intY, intX));
+                    }
 
+                    if (boolNorthwest && boolTileNorthwest) {
+                        atomicAdd(&fltTile[intTileY][intTileX], fltIn * fltNorthwest);
+                    }
 
-# end
+                    softsplat_atomic(tenOut, OFFSET_4(tenOut, intOutN, intChannel, intNorthwestY, intNorthwestX), fltIn * fltNorthwest, boolNorthwest && !boolTileNorthwest);
 
+                    if (boolNortheast && boolTileNortheast) {
+                        atomicAdd(&fltTile[intTileY][intTileX + 1], fltIn * fltNortheast);
+                    }
 
-@cupy.memoize(for_each_device=True)
-def cuda_launch(strKey: str):
-    if "CUDA_HOME" not in os.environ:
-        os.environ["CUDA_HOME"] = "/usr/local/cuda/"
-    # end
+                    softsplat_atomic(tenOut, OFFSET_4(tenOut, intOutN, intChannel, intNortheastY, intNortheastX), fltIn * fltNortheast, boolNortheast && !boolTileNortheast);
 
-    return cupy.cuda.compile_with_cache(
-        objCudacache[strKey]["strKernel"],
-        tuple(
-            [
-                "-I " + os.environ["CUDA_HOME"],
-                "-I " + os.environ["CUDA_HOME"] + "/include",
-            ]
-        ),
-    ).get_function(objCudacache[strKey]["strFunction"])
+                    if (boolSouthwest && boolTileSouthwest) {
+                        atomicAdd(&fltTile[intTileY + 1][intTileX], fltIn * fltSouthwest);
+                    }
 
+                    softsplat_atomic(tenOut, OFFSET_4(tenOut, intOutN, intChannel, intSouthwestY, intSouthwestX), fltIn * fltSouthwest, boolSouthwest && !boolTileSouthwest);
 
-# end
+                    if (boolSoutheast && boolTileSoutheast) {
+                        atomicAdd(&fltTile[intTileY + 1][intTileX + 1], fltIn * fltSoutheast);
+                    }
 
+                    softsplat_atomic(tenOut, OFFSET_4(tenOut, intOutN, intChannel, intSoutheastY, intSoutheastX), fltIn * fltSoutheast, boolSoutheast && !boolTileSoutheast);
 
-##########################################################
+                    __syncthreads();
 
+                    // only in-bounds corners ever reach the tile, so every non-zero entry maps into tenOut
 
-def softsplat(
-    tenIn: torch.Tensor, tenFlow: torch.Tensor, tenMetric: torch.Tensor, strMode: str
-):
-    assert strMode.split("-")[0] in ["sum", "avg", "linear", "soft"]
+                    for (int intShared = intThread; intShared < 18 * 18; intShared += 256) {
+                        float fltValue = fltTile[intShared / 18][intShared % 18];
 
-    if strMode == "sum":
-        assert tenMetric is None
-    if strMode == "avg":
-        assert tenMetric is None
-    if strMode.split("-")[0] == "linear":
-        assert tenMetric is not None
-    if strMode.split("-")[0] == "soft":
-        assert tenMetric is not None
+                        if (fltValue != 0.0f) {
+                            atomicAdd(&tenOut[OFFSET_4(tenOut, intOutN, intChannel, intAnchorY + (intShared / 18), intAnchorX + (intShared % 18))], fltValue);
+                        }
+                    }
 
-    if strMode == "avg":
-        tenIn = torch.cat(
-            [
-                tenIn,
-                tenIn.new_ones([tenIn.shape[0], 1, tenIn.shape[2], tenIn.shape[3]]),
+                    __syncthreads();
+                }
+            }
+        """,
+                {
+                    "intChans": tenIn.shape[1],
+                    "tenIn": tenIn,
+                    "intFlowpair": softsplat_flowpair(tenFlow),
+                    "tenFlow": tenFlow,
+                    "tenOut": tenOut,
+                },
+            )
+        )(
+            grid=tuple(
+                [
+                    int((tenOut.shape[3] + 16 - 1) / 16),
+                    int((tenOut.shape[2] + 16 - 1) / 16),
+                    tenIn.shape[0],
+                ]
+            ),
+            block=tuple([16, 16, 1]),
+            args=[
+                cuda_int32(tenIn.shape[0] * tenOut.shape[2] * tenOut.shape[3]),
+                tenIn.data_ptr(),
+                tenFlow.data_ptr(),
+                tenOut.data_ptr(),
             ],
-            1,
+            stream=cuda_stream(),
         )
 
-    elif strMode.split("-")[0] == "linear":
-        tenIn = torch.cat([tenIn * tenMetric, tenMetric], 1)
-
-    elif strMode.split("-")[0] == "soft":
-        tenIn = torch.cat([tenIn * tenMetric.exp(), tenMetric.exp()], 1)
+    elif tenIn.is_cuda != True:
+        assert False
 
     # end
 
-    tenOut = softsplat_func.apply(tenIn, tenFlow)
 
-    if strMode.split("-")[0] in ["avg", "linear", "soft"]:
-        tenNormalize = tenOut[:, -1:, :, :]
+# end
 
-        if len(strMode.split("-")) == 1:
-            tenNormalize = tenNormalize + 0.0000001
 
-        elif strMode.split("-")[1] == "addeps":
-            tenNormalize = tenNormalize + 0.0000001
+def softsplat_weight(
+    tenIn: torch.Tensor, tenMetric: torch.Tensor, tenTime: torch.Tensor
+):
+    # [tenIn * w, w] with w = tenTime * exp(clip(tenMetric, -20, 20)) in a single pass, no autograd
+    tenMetric = tenMetric.to(tenIn.dtype)
+    tenTime = tenTime.to(tenIn.dtype)
 
-        elif strMode.split("-")[1] == "zeroeps":
-            tenNormalize[tenNormalize == 0.0] = 1.0
+    tenOut = tenIn.new_empty(
+        [tenIn.shape[0], tenIn.shape[1] + 1, tenIn.shape[2], tenIn.shape[3]]
+    )
 
-        elif strMode.split("-")[1] == "clipeps":
-            tenNormalize = tenNormalize.clip(0.0000001, None)
+    if tenIn.is_cuda == True:
+        cuda_launch(
+            cuda_kernel(
+                "softsplat_weight",
+                """
+            extern "C" __global__ void __launch_bounds__(512) softsplat_weight(
+                const int n,
+                const {{type}}* __restrict__ tenIn,
+                const {{type}}* __restrict__ tenMetric,
+                const {{type}}* __restrict__ tenTime,
+                {{type}}* __restrict__ tenOut
+            ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
+                const int intN = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut) / SIZE_1(tenOut) );
+                const int intC = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut)                  ) % SIZE_1(tenOut);
+                const int intY = ( intIndex / SIZE_3(tenOut)                                   ) % SIZE_2(tenOut);
+                const int intX = ( intIndex                                                    ) % SIZE_3(tenOut);
+
+                const float fltMetric = (float) (VALUE_4(tenMetric, intN, 0, intY, intX));
+                const float fltWeight = (float) (VALUE_4(tenTime, intN, 0, 0, 0)) * expf(fminf(fmaxf(fltMetric, -20.0f), 20.0f));
+
+                if (intC < {{intChans}}) {
+                    tenOut[OFFSET_4(tenOut, intN, intC, intY, intX)] = (float) (VALUE_4(tenIn, intN, intC, intY, intX)) * fltWeight;
+                } else {
+                    tenOut[OFFSET_4(tenOut, intN, intC, intY, intX)] = fltWeight;
+                }
+            } }
+        """,
+                {
+                    "intChans": tenIn.shape[1],
+                    "tenIn": tenIn,
+                    "tenMetric": tenMetric,
+                    "tenTime": tenTime,
+                    "tenOut": tenOut,
+                },
+            )
+        )(
+            grid=tuple([int((tenOut.nelement() + 512 - 1) / 512), 1, 1]),
+            block=tuple([512, 1, 1]),
+            args=[
+                cuda_int32(tenOut.nelement()),
+                tenIn.data_ptr(),
+                tenMetric.data_ptr(),
+                tenTime.data_ptr(),
+                tenOut.data_ptr(),
+            ],
+            stream=cuda_stream(),
+        )
 
-        # end
+    elif tenIn.is_cuda != True:
+        assert False
 
-        tenOut = tenOut[:, :-1, :, :] / tenNormalize
     # end
 
     return tenOut
@@ -1449,89 +1793,24 @@ def softsplat(
 
 class softsplat_func(torch.autograd.Function):
     @staticmethod
-    @torch.cuda.amp.custom_fwd(cast_inputs=torch.float32)
+    @torch.cuda.amp.custom_fwd
     def forward(self, tenIn, tenFlow):
-        tenOut = tenIn.new_zeros(
-            [tenIn.shape[0], tenIn.shape[1], tenIn.shape[2], tenIn.shape[3]]
-        )
-
-        if tenIn.is_cuda == True:
-            cuda_launch(
-                cuda_kernel(
-                    "softsplat_out",
-                    """
-                extern "C" __global__ void __launch_bounds__(512) softsplat_out(
-                    const int n,
-                    const {{type}}* __restrict__ tenIn,
-                    const {{type}}* __restrict__ tenFlow,
-                    {{type}}* __restrict__ tenOut
-                ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
-                    const int intN = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut) / SIZE_1(tenOut) ) % SIZE_0(tenOut);
-                    const int intC = ( intIndex / SIZE_3(tenOut) / SIZE_2(tenOut)                  ) % SIZE_1(tenOut);
-                    const int intY = ( intIndex / SIZE_3(tenOut)                                   ) % SIZE_2(tenOut);
-                    const int intX = ( intIndex                                                    ) % SIZE_3(tenOut);
-
-                    assert(SIZE_1(tenFlow) == 2);
-
-                    {{type}} fltX = ({{type}}) (intX) + VALUE_4(tenFlow, intN, 0, intY, intX);
-                    {{type}} fltY = ({{type}}) (intY) + VALUE_4(tenFlow, intN, 1, intY, intX);
-
-                    if (isfinite(fltX) == false) { return; }
-                    if (isfinite(fltY) == false) { return; }
-
-                    {{type}} fltIn = VALUE_4(tenIn, intN, intC, intY, intX);
-
-                    int intNorthwestX = (int) (floor(fltX));
-                    int intNorthwestY = (int) (floor(fltY));
-                    int intNortheastX = intNorthwestX + 1;
-                    int intNortheastY = intNorthwestY;
-                    int intSouthwestX = intNorthwestX;
-                    int intSouthwestY = intNorthwestY + 1;
-                    int intSoutheastX = intNorthwestX + 1;
-                    int intSoutheastY = intNorthwestY + 1;
+        # half inputs are only accepted for inference, training keeps float32
+        if tenIn.dtype == torch.float16 and True not in self.needs_input_grad:
+            tenFlow = tenFlow.half()
 
-                    {{type}} fltNorthwest = (({{type}}) (intSoutheastX) - fltX) * (({{type}}) (intSoutheastY) - fltY);
-                    {{type}} fltNortheast = (fltX - ({{type}}) (intSouthwestX)) * (({{type}}) (intSouthwestY) - fltY);
-                    {{type}} fltSouthwest = (({{type}}) (intNortheastX) - fltX) * (fltY - ({{type}}) (intNortheastY));
-                    {{type}} fltSoutheast = (fltX - ({{type}}) (intNorthwestX)) * (fltY - ({{type}}) (intNorthwestY));
-
-                    if ((intNorthwestX >= 0) && (intNorthwestX < SIZE_3(tenOut)) && (intNorthwestY >= 0) && (intNorthwestY < SIZE_2(tenOut))) {
-                        atomicAdd(&tenOut[OFFSET_4(tenOut, intN, intC, intNorthwestY, intNorthwestX)], fltIn * fltNorthwest);
-                    }
-
-                    if ((intNortheastX >= 0) && (intNortheastX < SIZE_3(tenOut)) && (intNortheastY >= 0) && (intNortheastY < SIZE_2(tenOut))) {
-                        atomicAdd(&tenOut[OFFSET_4(tenOut, intN, intC, intNortheastY, intNortheastX)], fltIn * fltNortheast);
-                    }
-
-                    if ((intSouthwestX >= 0) && (intSouthwestX < SIZE_3(tenOut)) && (intSouthwestY >= 0) && (intSouthwestY < SIZE_2(tenOut))) {
-                        atomicAdd(&tenOut[OFFSET_4(tenOut, intN, intC, intSouthwestY, intSouthwestX)], fltIn * fltSouthwest);
-                    }
+        elif True:
+            tenIn = tenIn.float()
+            tenFlow = tenFlow.float()
 
-                    if ((intSoutheastX >= 0) && (intSoutheastX < SIZE_3(tenOut)) && (intSoutheastY >= 0) && (intSoutheastY < SIZE_2(tenOut))) {
-                        atomicAdd(&tenOut[OFFSET_4(tenOut, intN, intC, intSoutheastY, intSoutheastX)], fltIn * fltSoutheast);
-                    }
-                } }
-            """,
-                    {"tenIn": tenIn, "tenFlow": tenFlow, "tenOut": tenOut},
-                )
-            )(
-                grid=tuple([int((tenOut.nelement() + 512 - 1) / 512), 1, 1]),
-                block=tuple([512, 1, 1]),
-                args=[
-                    cuda_int32(tenOut.nelement()),
-                    tenIn.data_ptr(),
-                    tenFlow.data_ptr(),
-                    tenOut.data_ptr(),
-                ],
-                stream=collections.namedtuple("Stream", "ptr")(
-                    torch.cuda.current_stream().cuda_stream
-                ),
-            )
+        # end
 
-        elif tenIn.is_cuda != True:
-            assert False
+        tenOut = tenIn.new_zeros(
+            [tenIn.shape[0], tenIn.shape[1], tenIn.shape[2], tenIn.shape[3]],
+            dtype=torch.float32,
+        )
 
-        # end
+        softsplat_out(tenIn, tenFlow, tenOut)
 
         self.save_for_backward(tenIn, tenFlow)
 
@@ -1567,28 +1846,63 @@ class softsplat_func(torch.autograd.Function):
                 cuda_kernel(
                     "softsplat_ingrad",
                     """
-                extern "C" __global__ void __launch_bounds__(512) softsplat_ingrad(
+                extern "C" __global__ void __launch_bounds__(256) softsplat_ingrad(
                     const int n,
                     const {{type}}* __restrict__ tenIn,
                     const {{type}}* __restrict__ tenFlow,
                     const {{type}}* __restrict__ tenOutgrad,
                     {{type}}* __restrict__ tenIngrad,
                     {{type}}* __restrict__ tenFlowgrad
-                ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
-                    const int intN = ( intIndex / SIZE_3(tenIngrad) / SIZE_2(tenIngrad) / SIZE_1(tenIngrad) ) % SIZE_0(tenIngrad);
-                    const int intC = ( intIndex / SIZE_3(tenIngrad) / SIZE_2(tenIngrad)                     ) % SIZE_1(tenIngrad);
-                    const int intY = ( intIndex / SIZE_3(tenIngrad)                                         ) % SIZE_2(tenIngrad);
-                    const int intX = ( intIndex                                                             ) % SIZE_3(tenIngrad);
+                ) {
+                    // each 16x16 block stages the 18x18 window of tenOutgrad around the flow of its first pixel in shared memory
+
+                    __shared__ {{type}} fltTile[18][18];
+                    __shared__ int intAnchor[2];
+
+                    const int intN = blockIdx.z;
+                    const int intC = -1;
+                    const int intY = (blockIdx.y * 16) + threadIdx.y;
+                    const int intX = (blockIdx.x * 16) + threadIdx.x;
+                    const int intThread = (threadIdx.y * 16) + threadIdx.x;
 
                     assert(SIZE_1(tenFlow) == 2);
 
-                    {{type}} fltIngrad = 0.0f;
+                    if (intThread == 0) {
+                        {{type}} fltShiftX = LDG_4(tenFlow, intN, 0, intY, intX);
+                        {{type}} fltShiftY = LDG_4(tenFlow, intN, 1, intY, intX);
+
+                        intAnchor[0] = intY - 1 + (((isfinite(fltShiftY) == true) && (fabs(fltShiftY) < SIZE_2(tenOutgrad))) ? (int) (floor(fltShiftY)) : 0);
+                        intAnchor[1] = intX - 1 + (((isfinite(fltShiftX) == true) && (fabs(fltShiftX) < SIZE_3(tenOutgrad))) ? (int) (floor(fltShiftX)) : 0);
+                    }
+
+                    __syncthreads();
+
+                    const int intAnchorY = intAnchor[0];
+                    const int intAnchorX = intAnchor[1];
+
+                    // invalid or non-finite locations get corners that are all out of bounds and thus a zero gradient
 
-                    {{type}} fltX = ({{type}}) (intX) + VALUE_4(tenFlow, intN, 0, intY, intX);
-                    {{type}} fltY = ({{type}}) (intY) + VALUE_4(tenFlow, intN, 1, intY, intX);
+                    const bool boolValid = (intY < SIZE_2(tenOutgrad)) && (intX < SIZE_3(tenOutgrad));
 
-                    if (isfinite(fltX) == false) { return; }
-                    if (isfinite(fltY) == false) { return; }
+                    {{type}} fltX = -2.0f;
+                    {{type}} fltY = -2.0f;
+
+                    if (boolValid == true) {
+                        #if {{intFlowpair}} == 1
+                            const float2 fltFlow = __ldg((const float2*) (&tenFlow[OFFSET_4(tenFlow, intN, 0, intY, intX)]));
+
+                            fltX = ({{type}}) (intX) + fltFlow.x;
+                            fltY = ({{type}}) (intY) + fltFlow.y;
+                        #else
+                            fltX = ({{type}}) (intX) + LDG_4(tenFlow, intN, 0, intY, intX);
+                            fltY = ({{type}}) (intY) + LDG_4(tenFlow, intN, 1, intY, intX);
+                        #endif
+
+                        if ((isfinite(fltX) == false) || (isfinite(fltY) == false)) {
+                            fltX = -2.0f;
+                            fltY = -2.0f;
+                        }
+                    }
 
                     int intNorthwestX = (int) (floor(fltX));
                     int intNorthwestY = (int) (floor(fltY));
@@ -1599,32 +1913,76 @@ class softsplat_func(torch.autograd.Function):
                     int intSoutheastX = intNorthwestX + 1;
                     int intSoutheastY = intNorthwestY + 1;
 
-                    {{type}} fltNorthwest = (({{type}}) (intSoutheastX) - fltX) * (({{type}}) (intSoutheastY) - fltY);
-                    {{type}} fltNortheast = (fltX - ({{type}}) (intSouthwestX)) * (({{type}}) (intSouthwestY) - fltY);
-                    {{type}} fltSouthwest = (({{type}}) (intNortheastX) - fltX) * (fltY - ({{type}}) (intNortheastY));
-                    {{type}} fltSoutheast = (fltX - ({{type}}) (intNorthwestX)) * (fltY - ({{type}}) (intNorthwestY));
+                    {{type}} fltFracX = fltX - ({{type}}) (intNorthwestX);
+                    {{type}} fltFracY = fltY - ({{type}}) (intNorthwestY);
 
-                    if ((intNorthwestX >= 0) && (intNorthwestX < SIZE_3(tenOutgrad)) && (intNorthwestY >= 0) && (intNorthwestY < SIZE_2(tenOutgrad))) {
-                        fltIngrad += VALUE_4(tenOutgrad, intN, intC, intNorthwestY, intNorthwestX) * fltNorthwest;
-                    }
+                    {{type}} fltNorthwest = (1.0f - fltFracX) * (1.0f - fltFracY);
+                    {{type}} fltNortheast = fltFracX * (1.0f - fltFracY);
+                    {{type}} fltSouthwest = (1.0f - fltFracX) * fltFracY;
+                    {{type}} fltSoutheast = fltFracX * fltFracY;
 
-                    if ((intNortheastX >= 0) && (intNortheastX < SIZE_3(tenOutgrad)) && (intNortheastY >= 0) && (intNortheastY < SIZE_2(tenOutgrad))) {
-                        fltIngrad += VALUE_4(tenOutgrad, intN, intC, intNortheastY, intNortheastX) * fltNortheast;
-                    }
+                    // the corners share their rows and columns, so the bounds are checked once per row and column
+                    const bool boolWest = (intNorthwestX >= 0) && (intNorthwestX < SIZE_3(tenOutgrad));
+                    const bool boolEast = (intNortheastX >= 0) && (intNortheastX < SIZE_3(tenOutgrad));
+                    const bool boolNorth = (intNorthwestY >= 0) && (intNorthwestY < SIZE_2(tenOutgrad));
+                    const bool boolSouth = (intSouthwestY >= 0) && (intSouthwestY < SIZE_2(tenOutgrad));
 
-                    if ((intSouthwestX >= 0) && (intSouthwestX < SIZE_3(tenOutgrad)) && (intSouthwestY >= 0) && (intSouthwestY < SIZE_2(tenOutgrad))) {
-                        fltIngrad += VALUE_4(tenOutgrad, intN, intC, intSouthwestY, intSouthwestX) * fltSouthwest;
-                    }
+                    const bool boolNorthwest = boolNorth && boolWest;
+                    const bool boolNortheast = boolNorth && boolEast;
+                    const bool boolSouthwest = boolSouth && boolWest;
+                    const bool boolSoutheast = boolSouth && boolEast;
 
-                    if ((intSoutheastX >= 0) && (intSoutheastX < SIZE_3(tenOutgrad)) && (intSoutheastY >= 0) && (intSoutheastY < SIZE_2(tenOutgrad))) {
-                        fltIngrad += VALUE_4(tenOutgrad, intN, intC, intSoutheastY, intSoutheastX) * fltSoutheast;
-                    }
+                    const int intTileY = intNorthwestY - intAnchorY;
+                    const int intTileX = intNorthwestX - intAnchorX;
 
-                    tenIngrad[intIndex] = fltIngrad;
-                } }
+                    const bool boolTileWest = (intTileX >= 0) && (intTileX < 18);
+                    const bool boolTileEast = (intTileX + 1 >= 0) && (intTileX + 1 < 18);
+                    const bool boolTileNorth = (intTileY >= 0) && (intTileY < 18);
+                    const bool boolTileSouth = (intTileY + 1 >= 0) && (intTileY + 1 < 18);
+
+                    const bool boolTileNorthwest = boolTileNorth && boolTileWest;
+                    const bool boolTileNortheast = boolTileNorth && boolTileEast;
+                    const bool boolTileSouthwest = boolTileSouth && boolTileWest;
+                    const bool boolTileSoutheast = boolTileSouth && boolTileEast;
+
+                    // out of bounds corners get zero weights and a clamped location, which keeps the channel loop free of branches
+
+                    if (boolNorthwest == false) { fltNorthwest = 0.0f; intNorthwestX = 0; intNorthwestY = 0; }
+                    if (boolNortheast == false) { fltNortheast = 0.0f; intNortheastX = 0; intNortheastY = 0; }
+                    if (boolSouthwest == false) { fltSouthwest = 0.0f; intSouthwestX = 0; intSouthwestY = 0; }
+                    if (boolSoutheast == false) { fltSoutheast = 0.0f; intSoutheastX = 0; intSoutheastY = 0; }
+
+                    for (int intChannel = 0; intChannel < {{intChans}}; intChannel += 1) {
+                        for (int intShared = intThread; intShared < 18 * 18; intShared += 256) {
+                            const int intSharedY = intAnchorY + (intShared / 18);
+                            const int intSharedX = intAnchorX + (intShared % 18);
+
+                            if ((intSharedX >= 0) && (intSharedX < SIZE_3(tenOutgrad)) && (intSharedY >= 0) && (intSharedY < SIZE_2(tenOutgrad))) {
+                                fltTile[intShared / 18][intShared % 18] = LDG_4(tenOutgrad, intN, intChannel, intSharedY, intSharedX);
+                            } else {
+                                fltTile[intShared / 18][intShared % 18] = 0.0f;
+                            }
+                        }
+
+                        __syncthreads();
+
+                        {{type}} fltNorthwestgrad = boolTileNorthwest ? fltTile[intTileY][intTileX] : LDG_4(tenOutgrad, intN, intChannel, intNorthwestY, intNorthwestX);
+                        {{type}} fltNortheastgrad = boolTileNortheast ? fltTile[intTileY][intTileX + 1] : LDG_4(tenOutgrad, intN, intChannel, intNortheastY, intNortheastX);
+                        {{type}} fltSouthwestgrad = boolTileSouthwest ? fltTile[intTileY + 1][intTileX] : LDG_4(tenOutgrad, intN, intChannel, intSouthwestY, intSouthwestX);
+                        {{type}} fltSoutheastgrad = boolTileSoutheast ? fltTile[intTileY + 1][intTileX + 1] : LDG_4(tenOutgrad, intN, intChannel, intSoutheastY, intSoutheastX);
+
+                        if (boolValid == true) {
+                            tenIngrad[OFFSET_4(tenIngrad, intN, intChannel, intY, intX)] = (fltNorthwestgrad * fltNorthwest) + (fltNortheastgrad * fltNortheast) + (fltSouthwestgrad * fltSouthwest) + (fltSoutheastgrad * fltSoutheast);
+                        }
+
+                        __syncthreads();
+                    }
+                }
             """,
                     {
+                        "intChans": tenIn.shape[1],
                         "tenIn": tenIn,
+                        "intFlowpair": softsplat_flowpair(tenFlow),
                         "tenFlow": tenFlow,
                         "tenOutgrad": tenOutgrad,
                         "tenIngrad": tenIngrad,
@@ -1632,49 +1990,84 @@ class softsplat_func(torch.autograd.Function):
                     },
                 )
             )(
-                grid=tuple([int((tenIngrad.nelement() + 512 - 1) / 512), 1, 1]),
-                block=tuple([512, 1, 1]),
+                grid=tuple(
+                    [
+                        int((tenIngrad.shape[3] + 16 - 1) / 16),
+                        int((tenIngrad.shape[2] + 16 - 1) / 16),
+                        tenIngrad.shape[0],
+                    ]
+                ),
+                block=tuple([16, 16, 1]),
                 args=[
-                    cuda_int32(tenIngrad.nelement()),
+                    cuda_int32(
+                        tenIngrad.shape[0] * tenIngrad.shape[2] * tenIngrad.shape[3]
+                    ),
                     tenIn.data_ptr(),
                     tenFlow.data_ptr(),
                     tenOutgrad.data_ptr(),
                     tenIngrad.data_ptr(),
                     None,
                 ],
-                stream=collections.namedtuple("Stream", "ptr")(
-                    torch.cuda.current_stream().cuda_stream
-                ),
+                stream=cuda_stream(),
             )
         # end
 
         if tenFlowgrad is not None:
+            # a group of lanes shares each pixel and splits the channels among itself
+            intLanes = 1
+
+            while intLanes < min(tenIn.shape[1], 32):
+                intLanes *= 2
+            # end
+
             cuda_launch(
                 cuda_kernel(
                     "softsplat_flowgrad",
                     """
-                extern "C" __global__ void __launch_bounds__(512) softsplat_flowgrad(
+                extern "C" __global__ void __launch_bounds__(256) softsplat_flowgrad(
                     const int n,
                     const {{type}}* __restrict__ tenIn,
                     const {{type}}* __restrict__ tenFlow,
                     const {{type}}* __restrict__ tenOutgrad,
                     {{type}}* __restrict__ tenIngrad,
                     {{type}}* __restrict__ tenFlowgrad
-                ) { for (int intIndex = (blockIdx.x * blockDim.x) + threadIdx.x; intIndex < n; intIndex += blockDim.x * gridDim.x) {
-                    const int intN = ( intIndex / SIZE_3(tenFlowgrad) / SIZE_2(tenFlowgrad) / SIZE_1(tenFlowgrad) ) % SIZE_0(tenFlowgrad);
-                    const int intC = ( intIndex / SIZE_3(tenFlowgrad) / SIZE_2(tenFlowgrad)                       ) % SIZE_1(tenFlowgrad);
-                    const int intY = ( intIndex / SIZE_3(tenFlowgrad)                                             ) % SIZE_2(tenFlowgrad);
-                    const int intX = ( intIndex                                                                   ) % SIZE_3(tenFlowgrad);
+                ) {
+                    // every pixel is handled by {{intLanes}} consecutive lanes, each lane sums a strided subset of the channels
+                    // and the partial sums are reduced with shuffles, the groups never straddle a warp
+
+                    const int intIndex = (blockIdx.x * (256 / {{intLanes}})) + (threadIdx.x / {{intLanes}});
+                    const int intLane = threadIdx.x % {{intLanes}};
+
+                    const int intN = ( intIndex / SIZE_3(tenFlowgrad) / SIZE_2(tenFlowgrad) );
+                    const int intC = -1;
+                    const int intY = ( intIndex / SIZE_3(tenFlowgrad)                       ) % SIZE_2(tenFlowgrad);
+                    const int intX = ( intIndex                                             ) % SIZE_3(tenFlowgrad);
 
                     assert(SIZE_1(tenFlow) == 2);
 
-                    {{type}} fltFlowgrad = 0.0f;
+                    // lanes past the end still take part in the shuffles below, they just contribute zeros
 
-                    {{type}} fltX = ({{type}}) (intX) + VALUE_4(tenFlow, intN, 0, intY, intX);
-                    {{type}} fltY = ({{type}}) (intY) + VALUE_4(tenFlow, intN, 1, intY, intX);
+                    const bool boolValid = intIndex < n;
 
-                    if (isfinite(fltX) == false) { return; }
-                    if (isfinite(fltY) == false) { return; }
+                    {{type}} fltX = -2.0f;
+                    {{type}} fltY = -2.0f;
+
+                    if (boolValid == true) {
+                        #if {{intFlowpair}} == 1
+                            const float2 fltFlow = __ldg((const float2*) (&tenFlow[OFFSET_4(tenFlow, intN, 0, intY, intX)]));
+
+                            fltX = ({{type}}) (intX) + fltFlow.x;
+                            fltY = ({{type}}) (intY) + fltFlow.y;
+                        #else
+                            fltX = ({{type}}) (intX) + LDG_4(tenFlow, intN, 0, intY, intX);
+                            fltY = ({{type}}) (intY) + LDG_4(tenFlow, intN, 1, intY, intX);
+                        #endif
+
+                        if ((isfinite(fltX) == false) || (isfinite(fltY) == false)) {
+                            fltX = -2.0f;
+                            fltY = -2.0f;
+                        }
+                    }
 
                     int intNorthwestX = (int) (floor(fltX));
                     int intNorthwestY = (int) (floor(fltY));
@@ -1685,50 +2078,70 @@ class softsplat_func(torch.autograd.Function):
                     int intSoutheastX = intNorthwestX + 1;
                     int intSoutheastY = intNorthwestY + 1;
 
-                    {{type}} fltNorthwest = 0.0f;
-                    {{type}} fltNortheast = 0.0f;
-                    {{type}} fltSouthwest = 0.0f;
-                    {{type}} fltSoutheast = 0.0f;
+                    {{type}} fltFracX = fltX - ({{type}}) (intNorthwestX);
+                    {{type}} fltFracY = fltY - ({{type}}) (intNorthwestY);
 
-                    if (intC == 0) {
-                        fltNorthwest = (({{type}}) (-1.0f)) * (({{type}}) (intSoutheastY) - fltY);
-                        fltNortheast = (({{type}}) (+1.0f)) * (({{type}}) (intSouthwestY) - fltY);
-                        fltSouthwest = (({{type}}) (-1.0f)) * (fltY - ({{type}}) (intNortheastY));
-                        fltSoutheast = (({{type}}) (+1.0f)) * (fltY - ({{type}}) (intNorthwestY));
+                    {{type}} fltNorthwestX = fltFracY - 1.0f;
+                    {{type}} fltNortheastX = 1.0f - fltFracY;
+                    {{type}} fltSouthwestX = -fltFracY;
+                    {{type}} fltSoutheastX = fltFracY;
 
-                    } else if (intC == 1) {
-                        fltNorthwest = (({{type}}) (intSoutheastX) - fltX) * (({{type}}) (-1.0f));
-                        fltNortheast = (fltX - ({{type}}) (intSouthwestX)) * (({{type}}) (-1.0f));
-                        fltSouthwest = (({{type}}) (intNortheastX) - fltX) * (({{type}}) (+1.0f));
-                        fltSoutheast = (fltX - ({{type}}) (intNorthwestX)) * (({{type}}) (+1.0f));
+                    {{type}} fltNorthwestY = fltFracX - 1.0f;
+                    {{type}} fltNortheastY = -fltFracX;
+                    {{type}} fltSouthwestY = 1.0f - fltFracX;
+                    {{type}} fltSoutheastY = fltFracX;
 
-                    }
+                    // the corners share their rows and columns, so the bounds are checked once per row and column
+                    const bool boolWest = (intNorthwestX >= 0) && (intNorthwestX < SIZE_3(tenOutgrad));
+                    const bool boolEast = (intNortheastX >= 0) && (intNortheastX < SIZE_3(tenOutgrad));
+                    const bool boolNorth = (intNorthwestY >= 0) && (intNorthwestY < SIZE_2(tenOutgrad));
+                    const bool boolSouth = (intSouthwestY >= 0) && (intSouthwestY < SIZE_2(tenOutgrad));
 
-                    for (int intChannel = 0; intChannel < SIZE_1(tenOutgrad); intChannel += 1) {
-                        {{type}} fltIn = VALUE_4(tenIn, intN, intChannel, intY, intX);
+                    const bool boolNorthwest = boolNorth && boolWest;
+                    const bool boolNortheast = boolNorth && boolEast;
+                    const bool boolSouthwest = boolSouth && boolWest;
+                    const bool boolSoutheast = boolSouth && boolEast;
 
-                        if ((intNorthwestX >= 0) && (intNorthwestX < SIZE_3(tenOutgrad)) && (intNorthwestY >= 0) && (intNorthwestY < SIZE_2(tenOutgrad))) {
-                            fltFlowgrad += VALUE_4(tenOutgrad, intN, intChannel, intNorthwestY, intNorthwestX) * fltIn * fltNorthwest;
-                        }
+                    // out of bounds corners get zero weights and a clamped location, which keeps the channel loop free of branches
 
-                        if ((intNortheastX >= 0) && (intNortheastX < SIZE_3(tenOutgrad)) && (intNortheastY >= 0) && (intNortheastY < SIZE_2(tenOutgrad))) {
-                            fltFlowgrad += VALUE_4(tenOutgrad, intN, intChannel, intNortheastY, intNortheastX) * fltIn * fltNortheast;
-                        }
+                    if (boolNorthwest == false) { fltNorthwestX = 0.0f; fltNorthwestY = 0.0f; intNorthwestX = 0; intNorthwestY = 0; }
+                    if (boolNortheast == false) { fltNortheastX = 0.0f; fltNortheastY = 0.0f; intNortheastX = 0; intNortheastY = 0; }
+                    if (boolSouthwest == false) { fltSouthwestX = 0.0f; fltSouthwestY = 0.0f; intSouthwestX = 0; intSouthwestY = 0; }
+                    if (boolSoutheast == false) { fltSoutheastX = 0.0f; fltSoutheastY = 0.0f; intSoutheastX = 0; intSoutheastY = 0; }
 
-                        if ((intSouthwestX >= 0) && (intSouthwestX < SIZE_3(tenOutgrad)) && (intSouthwestY >= 0) && (intSouthwestY < SIZE_2(tenOutgrad))) {
-                            fltFlowgrad += VALUE_4(tenOutgrad, intN, intChannel, intSouthwestY, intSouthwestX) * fltIn * fltSouthwest;
-                        }
+                    {{type}} fltFlowgradX = 0.0f;
+                    {{type}} fltFlowgradY = 0.0f;
+
+                    if (boolValid == true) {
+                        for (int intChannel = intLane; intChannel < {{intChans}}; intChannel += {{intLanes}}) {
+                            {{type}} fltIn = LDG_4(tenIn, intN, intChannel, intY, intX);
 
-                        if ((intSoutheastX >= 0) && (intSoutheastX < SIZE_3(tenOutgrad)) && (intSoutheastY >= 0) && (intSoutheastY < SIZE_2(tenOutgrad))) {
-                            fltFlowgrad += VALUE_4(tenOutgrad, intN, intChannel, intSoutheastY, intSoutheastX) * fltIn * fltSoutheast;
+                            {{type}} fltNorthwestgrad = LDG_4(tenOutgrad, intN, intChannel, intNorthwestY, intNorthwestX);
+                            {{type}} fltNortheastgrad = LDG_4(tenOutgrad, intN, intChannel, intNortheastY, intNortheastX);
+                            {{type}} fltSouthwestgrad = LDG_4(tenOutgrad, intN, intChannel, intSouthwestY, intSouthwestX);
+                            {{type}} fltSoutheastgrad = LDG_4(tenOutgrad, intN, intChannel, intSoutheastY, intSoutheastX);
+
+                            fltFlowgradX += fltIn * ((fltNorthwestgrad * fltNorthwestX) + (fltNortheastgrad * fltNortheastX) + (fltSouthwestgrad * fltSouthwestX) + (fltSoutheastgrad * fltSoutheastX));
+                            fltFlowgradY += fltIn * ((fltNorthwestgrad * fltNorthwestY) + (fltNortheastgrad * fltNortheastY) + (fltSouthwestgrad * fltSouthwestY) + (fltSoutheastgrad * fltSoutheastY));
                         }
                     }
 
-                    tenFlowgrad[intIndex] = fltFlowgrad;
-                } }
+                    for (int intShift = {{intLanes}} / 2; intShift > 0; intShift /= 2) {
+                        fltFlowgradX += __shfl_down_sync(0xffffffff, fltFlowgradX, intShift, {{intLanes}});
+                        fltFlowgradY += __shfl_down_sync(0xffffffff, fltFlowgradY, intShift, {{intLanes}});
+                    }
+
+                    if ((boolValid == true) && (intLane == 0)) {
+                        tenFlowgrad[OFFSET_4(tenFlowgrad, intN, 0, intY, intX)] = fltFlowgradX;
+                        tenFlowgrad[OFFSET_4(tenFlowgrad, intN, 1, intY, intX)] = fltFlowgradY;
+                    }
+                }
             """,
                     {
+                        "intChans": tenIn.shape[1],
+                        "intLanes": intLanes,
                         "tenIn": tenIn,
+                        "intFlowpair": softsplat_flowpair(tenFlow),
                         "tenFlow": tenFlow,
                         "tenOutgrad": tenOutgrad,
                         "tenIngrad": tenIngrad,
@@ -1736,19 +2149,38 @@ class softsplat_func(torch.autograd.Function):
                     },
                 )
             )(
-                grid=tuple([int((tenFlowgrad.nelement() + 512 - 1) / 512), 1, 1]),
-                block=tuple([512, 1, 1]),
+                grid=tuple(
+                    [
+                        int(
+                            (
+                                (
+                                    tenFlowgrad.shape[0]
+                                    * tenFlowgrad.shape[2]
+                                    * tenFlowgrad.shape[3]
+                                )
+                                + (256 // intLanes)
+                                - 1
+                            )
+                            / (256 // intLanes)
+                        ),
+                        1,
+                        1,
+                    ]
+                ),
+                block=tuple([256, 1, 1]),
                 args=[
-                    cuda_int32(tenFlowgrad.nelement()),
+                    cuda_int32(
+                        tenFlowgrad.shape[0]
+                        * tenFlowgrad.shape[2]
+                        * tenFlowgrad.shape[3]
+                    ),
                     tenIn.data_ptr(),
                     tenFlow.data_ptr(),
                     tenOutgrad.data_ptr(),
                     None,
                     tenFlowgrad.data_ptr(),
                 ],
-                stream=collections.namedtuple("Stream", "ptr")(
-                    torch.cuda.current_stream().cuda_stream
-                ),
+                stream=cuda_stream(),
             )
         # end
 
@@ -1766,34 +2198,36 @@ class softsplat_func(torch.autograd.Function):
 def forwarp_mframe_mask(
     tenIn1, tenFlow1, t1, tenIn2, tenFlow2, t2, tenMetric1=None, tenMetric2=None
 ):
-    def one_fdir(tenIn, tenFlow, td, tenMetric):
-        tenIn = torch.cat(
-            [
-                tenIn * td * (tenMetric).clip(-20.0, 20.0).exp(),
-                td * (tenMetric).clip(-20.0, 20.0).exp(),
-            ],
-            1,
-        )
+    # all branches of both directions are folded into the batch and splatted in one go
+    flow_num = tenFlow1.shape[0]
+    N_, C_, H_, W_ = tenIn1.shape[1:]
 
-        tenOut = softsplat_func.apply(tenIn, tenFlow)
+    tenIn = torch.cat([tenIn1, tenIn2], 0).flatten(0, 1)
+    tenFlow = torch.cat([tenFlow1, tenFlow2], 0).flatten(0, 1)
+    td = torch.cat([t1, t2], 0).flatten(0, 1)
+    tenMetric = torch.cat([tenMetric1, tenMetric2], 0).flatten(0, 1)
 
-        return tenOut[:, :-1, :, :], tenOut[:, -1:, :, :] + 0.0000001
+    if torch.is_grad_enabled() == False and tenIn.is_cuda == True:
+        # without autograd the kernel sums every splat straight into a single accumulator
+        tenOut = tenIn.new_zeros([N_, C_ + 1, H_, W_], dtype=torch.float32)
 
-    flow_num = tenFlow1.shape[0]
-    tenOut = 0
-    tenNormalize = 0
-    for idx in range(flow_num):
-        tenOutF, tenNormalizeF = one_fdir(
-            tenIn1[idx], tenFlow1[idx], t1[idx], tenMetric1[idx]
-        )
-        tenOutB, tenNormalizeB = one_fdir(
-            tenIn2[idx], tenFlow2[idx], t2[idx], tenMetric2[idx]
+        softsplat_out(softsplat_weight(tenIn, tenMetric, td), tenFlow, tenOut)
+
+    elif True:
+        tenWeight = td * (tenMetric).clip(-20.0, 20.0).exp()
+
+        tenOut = softsplat_func.apply(
+            torch.cat([tenIn * tenWeight, tenWeight], 1), tenFlow
         )
 
-        tenOut += tenOutF + tenOutB
-        tenNormalize += tenNormalizeF + tenNormalizeB
+        tenOut = tenOut.view(2 * flow_num, N_, C_ + 1, H_, W_).sum(0)
+
+    # end
+
+    # every one of the splats used to add its own epsilon to the normalization
+    tenNormalize = tenOut[:, -1:, :, :] + (2 * flow_num * 0.0000001)
 
-    return tenOut / tenNormalize, tenNormalize < 0.00001
+    return tenOut[:, :-1, :, :] / tenNormalize, tenNormalize < 0.00001
 
 
 ###################################################################
@@ -1929,147 +2363,141 @@ class EncDec(torch.nn.Module):
 
         self.sigmoid = torch.nn.Sigmoid()
 
-    def forward(self, flow0, flow1, im0, im1, c0, c1):
+    def forward(self, flow0, flow1, im0, im1, c):
+        # both directions run as a single batch of 2N samples, c is the image pyramid of that
+        # batch, and rolling by N pairs every sample with its counterpart for the warps
         N_, C_, H_, W_ = im0.shape
 
-        wim1 = backwarp(im1, flow0)
-        wim0 = backwarp(im0, flow1)
-        s0_0 = self.down0(torch.cat((flow0, im0, wim1), 1))
-        s1_0 = self.down0(torch.cat((flow1, im1, wim0), 1))
+        flow = torch.cat((flow0, flow1), 0)
+        im = torch.cat((im0, im1), 0)
+
+        wim = backwarp(torch.cat((im1, im0), 0), flow)
+        s_0 = self.down0(torch.cat((flow, im, wim), 1))
+
+        # the sizes are multiples of 16 here, for which halving with bilinear interpolation
+        # and without aligned corners is exactly a 2x2 average
 
         #########################################################################################
-        flow0 = (
-            torch.nn.functional.interpolate(
-                flow0, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
-        flow1 = (
-            torch.nn.functional.interpolate(
-                flow1, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
+        flow = torch.nn.functional.avg_pool2d(input=flow, kernel_size=2, stride=2) * 0.5
 
-        wf0 = backwarp(torch.cat((s0_0, c0[0]), 1), flow1)
-        wf1 = backwarp(torch.cat((s1_0, c1[0]), 1), flow0)
+        wf = backwarp(torch.cat((s_0, c[0]), 1).roll(N_, 0), flow)
 
-        s0_1 = self.down1(torch.cat((s0_0, c0[0], wf1), 1))
-        s1_1 = self.down1(torch.cat((s1_0, c1[0], wf0), 1))
+        s_1 = self.down1(torch.cat((s_0, c[0], wf), 1))
 
         #########################################################################################
-        flow0 = (
-            torch.nn.functional.interpolate(
-                flow0, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
-        flow1 = (
-            torch.nn.functional.interpolate(
-                flow1, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
+        flow = torch.nn.functional.avg_pool2d(input=flow, kernel_size=2, stride=2) * 0.5
 
-        wf0 = backwarp(torch.cat((s0_1, c0[1]), 1), flow1)
-        wf1 = backwarp(torch.cat((s1_1, c1[1]), 1), flow0)
+        wf = backwarp(torch.cat((s_1, c[1]), 1).roll(N_, 0), flow)
 
-        s0_2 = self.down2(torch.cat((s0_1, c0[1], wf1), 1))
-        s1_2 = self.down2(torch.cat((s1_1, c1[1], wf0), 1))
+        s_2 = self.down2(torch.cat((s_1, c[1], wf), 1))
 
         #########################################################################################
-        flow0 = (
-            torch.nn.functional.interpolate(
-                flow0, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
-        flow1 = (
-            torch.nn.functional.interpolate(
-                flow1, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
+        flow = torch.nn.functional.avg_pool2d(input=flow, kernel_size=2, stride=2) * 0.5
 
-        wf0 = backwarp(torch.cat((s0_2, c0[2]), 1), flow1)
-        wf1 = backwarp(torch.cat((s1_2, c1[2]), 1), flow0)
+        wf = backwarp(torch.cat((s_2, c[2]), 1).roll(N_, 0), flow)
 
-        s0_3 = self.down3(torch.cat((s0_2, c0[2], wf1), 1))
-        s1_3 = self.down3(torch.cat((s1_2, c1[2], wf0), 1))
+        s_3 = self.down3(torch.cat((s_2, c[2], wf), 1))
 
         #########################################################################################
 
-        s0_3_c = self.conv_C(s0_3)
-        s0_3_c = s0_3_c.view(N_, 16, -1, 1, 1)
+        # the 1x1 convolutions of conv_C, conv_H and conv_W act on pooled vectors, so they are
+        # applied as linear layers with their weights, which keeps the state dict as it is
+        s_3_c = torch.nn.functional.linear(
+            s_3.mean([2, 3]), self.conv_C[1].weight.flatten(1), self.conv_C[1].bias
+        ).sigmoid()
+        s_3_c = s_3_c.view(2 * N_, 16, -1)
 
-        s0_3_h = self.conv_H(s0_3)
-        s0_3_h = s0_3_h.view(N_, 16, 1, -1, 1)
+        s_3_h = torch.nn.functional.linear(
+            s_3.mean(3).transpose(1, 2),
+            self.conv_H[1].weight.flatten(1),
+            self.conv_H[1].bias,
+        ).sigmoid()
 
-        s0_3_w = self.conv_W(s0_3)
-        s0_3_w = s0_3_w.view(N_, 16, 1, 1, -1)
+        s_3_w = torch.nn.functional.linear(
+            s_3.mean(2).transpose(1, 2),
+            self.conv_W[1].weight.flatten(1),
+            self.conv_W[1].bias,
+        ).sigmoid()
 
-        cube0 = (s0_3_c * s0_3_h * s0_3_w).mean(1)
+        # the mean over the 16 rank-one terms without materializing the 5d outer product
+        cube = torch.einsum("nkc,nhk,nwk->nchw", s_3_c, s_3_h, s_3_w) / 16.0
 
-        s0_3 = s0_3 * cube0
+        s_3 = s_3 * cube
 
-        s1_3_c = self.conv_C(s1_3)
-        s1_3_c = s1_3_c.view(N_, 16, -1, 1, 1)
+        #########################################################################################
+        flow = torch.nn.functional.avg_pool2d(input=flow, kernel_size=2, stride=2) * 0.5
 
-        s1_3_h = self.conv_H(s1_3)
-        s1_3_h = s1_3_h.view(N_, 16, 1, -1, 1)
+        wf = backwarp(torch.cat((s_3, c[3]), 1).roll(N_, 0), flow)
 
-        s1_3_w = self.conv_W(s1_3)
-        s1_3_w = s1_3_w.view(N_, 16, 1, 1, -1)
+        x = self.up0(torch.cat((s_3, c[3], wf), 1))
+        x = self.up1(torch.cat((s_2, x), 1))
+        x = self.up2(torch.cat((s_1, x), 1))
+        x = self.up3(torch.cat((s_0, x), 1))
 
-        cube1 = (s1_3_c * s1_3_h * s1_3_w).mean(1)
+        if torch.is_grad_enabled() == True:
+            m = self.sigmoid(self.conv_m(x)) * 0.8 + 0.1
 
-        s1_3 = s1_3 * cube1
+        elif torch.is_grad_enabled() == False:
+            m = self.conv_m(x).sigmoid_().mul_(0.8).add_(0.1)
 
-        #########################################################################################
-        flow0 = (
-            torch.nn.functional.interpolate(
-                flow0, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
-        )
-        flow1 = (
-            torch.nn.functional.interpolate(
-                flow1, scale_factor=0.5, mode="bilinear", align_corners=False
-            )
-            * 0.5
+        # end
+
+        x = self.conv(x)
+
+        x0, x1 = x.chunk(2, 0)
+        m0, m1 = m.chunk(2, 0)
+
+        # the caller folds the branches into the batch, which is the one place these get copied
+        return (
+            x0,
+            x1,
+            m0.expand(-1, self.branch, -1, -1),
+            m1.expand(-1, self.branch, -1, -1),
         )
 
-        wf0 = backwarp(torch.cat((s0_3, c0[3]), 1), flow1)
-        wf1 = backwarp(torch.cat((s1_3, c1[3]), 1), flow0)
 
-        x0 = self.up0(torch.cat((s0_3, c0[3], wf1), 1))
-        x1 = self.up0(torch.cat((s1_3, c1[3], wf0), 1))
+@torch.jit.script
+def photometric(tenOne: torch.Tensor, tenTwo: torch.Tensor, tenWeight: torch.Tensor):
+    # scripted so that the pointwise chain around the channel mean gets fused
+    tenOut = (1.0 - (tenWeight * (tenOne - tenTwo).abs().mean([1], True))).clamp(
+        min=0.001
+    )
+
+    return tenOut * tenOut
+
 
-        x0 = self.up1(torch.cat((s0_2, x0), 1))
-        x1 = self.up1(torch.cat((s1_2, x1), 1))
+# end
 
-        x0 = self.up2(torch.cat((s0_1, x0), 1))
-        x1 = self.up2(torch.cat((s1_1, x1), 1))
 
-        x0 = self.up3(torch.cat((s0_0, x0), 1))
-        x1 = self.up3(torch.cat((s1_0, x1), 1))
+@torch.jit.script
+def blend(
+    tenOut: torch.Tensor,
+    tenMask: torch.Tensor,
+    tenOne: torch.Tensor,
+    tenTwo: torch.Tensor,
+    tenOnetime: torch.Tensor,
+    tenTwotime: torch.Tensor,
+    tenStd: torch.Tensor,
+    tenMean: torch.Tensor,
+):
+    # fills the holes of the splatted frame with the linear blend and undoes the normalization
+    tenOut = tenOut + (tenMask * ((tenOnetime * tenOne) + (tenTwotime * tenTwo)))
 
-        m0 = self.sigmoid(self.conv_m(x0)) * 0.8 + 0.1
-        m1 = self.sigmoid(self.conv_m(x1)) * 0.8 + 0.1
+    return (tenOut * (tenStd + 0.0000001)) + tenMean
 
-        x0 = self.conv(x0)
-        x1 = self.conv(x1)
 
-        return x0, x1, m0.repeat(1, self.branch, 1, 1), m1.repeat(1, self.branch, 1, 1)
+# end
 
 
 class M2M_PWC(torch.nn.Module):
-    def __init__(self, ratio=4):
+    def __init__(self, ratio=4, graph=False, dtype=None):
         super(M2M_PWC, self).__init__()
         self.branch = 4
         self.ratio = ratio
+        self.dtype = dtype
+        self.objGraphs = {}
 
-        self.netFlow = Network()
+        self.netFlow = Network(boolGraph=graph)
 
         self.paramAlpha = torch.nn.Parameter(10.0 * torch.ones(1, 1, 1, 1))
 
@@ -2094,10 +2522,9 @@ class M2M_PWC(torch.nn.Module):
                     align_corners=False,
                 )
 
-                c0 = self.img_pyramid(im0)
-                c1 = self.img_pyramid(im1)
+                c = self.img_pyramid(torch.cat((im0, im1), 0))
 
-                flow_res = self.motion_encdec(flow0, flow1, im0, im1, c0, c1)
+                flow_res = self.motion_encdec(flow0, flow1, im0, im1, c)
 
                 flow0 = flow0.repeat(1, self.branch, 1, 1) + flow_res[0]
                 flow1 = flow1.repeat(1, self.branch, 1, 1) + flow_res[1]
@@ -2106,12 +2533,71 @@ class M2M_PWC(torch.nn.Module):
 
         self.MRN = MotionRefineNet(self.branch)
 
+        self.to(memory_format=torch.channels_last)
+
+    def warmup(self, intHeight, intWidth, ratio=None):
+        if ratio is None:
+            ratio = self.ratio
+
+        intHeight += ((ratio * 16) - (intHeight % (ratio * 16))) % (ratio * 16)
+        intWidth += ((ratio * 16) - (intWidth % (ratio * 16))) % (ratio * 16)
+
+        intHeight = int(intHeight * 2.0 / ratio)
+        intWidth = int(intWidth * 2.0 / ratio)
+
+        # inference writes the cost volume into a slice of the decoder input, whose strides
+        # are part of the kernel source, so a dry run of the flow network is what compiles
+        # exactly the kernels that inference launches at every pyramid level
+        tenZeros = torch.zeros([1, 3, intHeight, intWidth], device="cuda").contiguous(
+            memory_format=torch.channels_last
+        )
+
+        with torch.no_grad():
+            if self.dtype is None:
+                self.netFlow.bidir_eager(tenZeros, tenZeros)
+
+            elif self.dtype is not None:
+                with torch.autocast(
+                    device_type="cuda", dtype=self.dtype, cache_enabled=False
+                ):
+                    self.netFlow.bidir_eager(tenZeros, tenZeros)
+                # end
+
+            # end
+        # end
+
     def forward(self, im0, im1, fltTimes=[0.5], ratio=None):
         if ratio is None:
             ratio = self.ratio
 
-        intWidth = im0.shape[3] and im1.shape[3]
-        intHeight = im0.shape[2] and im1.shape[2]
+        # replay the entire interpolation as one cuda graph per input shape, the time steps are
+        # graph inputs as well so that only their number and shape is baked into the capture
+        # the flow network must not capture a graph of its own, not even during the uncaptured
+        # warmup passes, so its graph is turned off explicitly and it is recorded inline
+        if (
+            self.netFlow.boolGraph == True
+            and torch.is_grad_enabled() == False
+            and im0.is_cuda == True
+            and torch.cuda.is_current_stream_capturing() == False
+        ):
+            return cuda_graph(
+                self.objGraphs.setdefault(ratio, {}),
+                lambda im0, im1, *fltTimes: self.forward_eager(
+                    im0, im1, list(fltTimes), ratio, False
+                ),
+                [im0, im1] + list(fltTimes),
+            )
+        # end
+
+        return self.forward_eager(im0, im1, fltTimes, ratio)
+
+    # end
+
+    def forward_eager(self, im0, im1, fltTimes, ratio, boolGraph=True):
+        assert im0.shape == im1.shape
+
+        intHeight = im0.shape[2]
+        intWidth = im0.shape[3]
 
         intPadr = ((ratio * 16) - (intWidth % (ratio * 16))) % (ratio * 16)
         intPadb = ((ratio * 16) - (intHeight % (ratio * 16))) % (ratio * 16)
@@ -2123,6 +2609,11 @@ class M2M_PWC(torch.nn.Module):
             input=im1, pad=[0, intPadr, 0, intPadb], mode="replicate"
         )
 
+        # the refinement and the warping run channels last, the output is built from the
+        # splatted result which is in the standard layout again
+        im0 = im0.contiguous(memory_format=torch.channels_last)
+        im1 = im1.contiguous(memory_format=torch.channels_last)
+
         N_, C_, H_, W_ = im0.shape
 
         outputs = []
@@ -2146,8 +2637,7 @@ class M2M_PWC(torch.nn.Module):
             im0_o = (im0 - tenMean_) / (tenStd_ + 0.0000001)
             im1_o = (im1 - tenMean_) / (tenStd_ + 0.0000001)
 
-            im0 = (im0 - tenMean_) / (tenStd_ + 0.0000001)
-            im1 = (im1 - tenMean_) / (tenStd_ + 0.0000001)
+            im0, im1 = im0_o, im1_o
 
         im0_ = torch.nn.functional.interpolate(
             input=im0, scale_factor=2.0 / ratio, mode="bilinear", align_corners=False
@@ -2156,16 +2646,38 @@ class M2M_PWC(torch.nn.Module):
             input=im1, scale_factor=2.0 / ratio, mode="bilinear", align_corners=False
         )
 
-        tenFwd, tenBwd = self.netFlow.bidir(im0_, im1_)
+        if self.dtype is None:
+            tenFwd, tenBwd = self.netFlow.bidir(im0_, im1_, boolGraph)
+            tenFwd, tenBwd, WeiMF, WeiMB = self.MRN(tenFwd, tenBwd, im0, im1, ratio)
+
+        elif self.dtype is not None:
+            # the convolutions of both networks run in reduced precision, while the flows are
+            # upsampled and summed in float32 and the metric and the splatting stay float32 too
+
+            # the autocast weight cache does not mix with cuda graph capture, nor with the two
+            # decoder streams, the second would read casts the first is still writing
+            with torch.autocast(
+                device_type="cuda", dtype=self.dtype, cache_enabled=False
+            ):
+                tenFwd, tenBwd = self.netFlow.bidir(im0_, im1_, boolGraph)
+                tenFwd, tenBwd, WeiMF, WeiMB = self.MRN(
+                    tenFwd.float(), tenBwd.float(), im0, im1, ratio
+                )
+            # end
+
+            tenFwd = tenFwd.float()
+            tenBwd = tenBwd.float()
+            WeiMF = WeiMF.float()
+            WeiMB = WeiMB.float()
 
-        tenFwd, tenBwd, WeiMF, WeiMB = self.MRN(tenFwd, tenBwd, im0, im1, ratio)
+        # end
 
         for fltTime_ in fltTimes:
-            im0 = im0_o.repeat(1, self.branch, 1, 1)
-            im1 = im1_o.repeat(1, self.branch, 1, 1)
-            tenStd = tenStd_.repeat(1, self.branch, 1, 1)
-            tenMean = tenMean_.repeat(1, self.branch, 1, 1)
-            fltTime = fltTime_.repeat(1, self.branch, 1, 1)
+            # the branches share the frames and the time, so these are expanded instead of
+            # repeated and only materialized where backwarp needs a matching batch
+            im0 = im0_o.unsqueeze(1).expand(N_, self.branch, 3, H_, W_)
+            im1 = im1_o.unsqueeze(1).expand(N_, self.branch, 3, H_, W_)
+            fltTime = fltTime_.expand(N_, self.branch, 1, 1)
 
             tenFwd = tenFwd.reshape(N_, self.branch, 2, H_, W_).view(
                 N_ * self.branch, 2, H_, W_
@@ -2174,52 +2686,16 @@ class M2M_PWC(torch.nn.Module):
                 N_ * self.branch, 2, H_, W_
             )
 
-            WeiMF = WeiMF.reshape(N_, self.branch, 1, H_, W_).view(
-                N_ * self.branch, 1, H_, W_
-            )
-            WeiMB = WeiMB.reshape(N_, self.branch, 1, H_, W_).view(
-                N_ * self.branch, 1, H_, W_
-            )
+            WeiMF = WeiMF.reshape(N_ * self.branch, 1, H_, W_)
+            WeiMB = WeiMB.reshape(N_ * self.branch, 1, H_, W_)
 
-            im0 = im0.reshape(N_, self.branch, 3, H_, W_).view(
-                N_ * self.branch, 3, H_, W_
-            )
-            im1 = im1.reshape(N_, self.branch, 3, H_, W_).view(
-                N_ * self.branch, 3, H_, W_
-            )
+            im0 = im0.reshape(N_ * self.branch, 3, H_, W_)
+            im1 = im1.reshape(N_ * self.branch, 3, H_, W_)
 
-            tenStd = tenStd.reshape(N_, self.branch, 1, 1, 1).view(
-                N_ * self.branch, 1, 1, 1
-            )
-            tenMean = tenMean.reshape(N_, self.branch, 1, 1, 1).view(
-                N_ * self.branch, 1, 1, 1
-            )
-            fltTime = fltTime.reshape(N_, self.branch, 1, 1, 1).view(
-                N_ * self.branch, 1, 1, 1
-            )
+            fltTime = fltTime.reshape(N_ * self.branch, 1, 1, 1)
 
-            tenPhotoone = (
-                (
-                    1.0
-                    - (
-                        WeiMF
-                        * (im0 - backwarp(im1, tenFwd).detach()).abs().mean([1], True)
-                    )
-                )
-                .clip(0.001, None)
-                .square()
-            )
-            tenPhototwo = (
-                (
-                    1.0
-                    - (
-                        WeiMB
-                        * (im1 - backwarp(im0, tenBwd).detach()).abs().mean([1], True)
-                    )
-                )
-                .clip(0.001, None)
-                .square()
-            )
+            tenPhotoone = photometric(im0, backwarp(im1, tenFwd).detach(), WeiMF)
+            tenPhototwo = photometric(im1, backwarp(im0, tenBwd).detach(), WeiMB)
 
             t0 = fltTime
             flow0 = tenFwd * t0
@@ -2229,14 +2705,16 @@ class M2M_PWC(torch.nn.Module):
             flow1 = tenBwd * t1
             metric1 = self.paramAlpha * tenPhototwo
 
+            # these stay strided views, forwarp_mframe_mask folds both directions into the
+            # batch with one torch.cat per input which is also the only copy they go through
             flow0 = flow0.reshape(N_, self.branch, 2, H_, W_).permute(1, 0, 2, 3, 4)
             flow1 = flow1.reshape(N_, self.branch, 2, H_, W_).permute(1, 0, 2, 3, 4)
 
             metric0 = metric0.reshape(N_, self.branch, 1, H_, W_).permute(1, 0, 2, 3, 4)
             metric1 = metric1.reshape(N_, self.branch, 1, H_, W_).permute(1, 0, 2, 3, 4)
 
-            im0 = im0.reshape(N_, self.branch, 3, H_, W_).permute(1, 0, 2, 3, 4)
-            im1 = im1.reshape(N_, self.branch, 3, H_, W_).permute(1, 0, 2, 3, 4)
+            im0 = im0_o.unsqueeze(0).expand(self.branch, N_, 3, H_, W_)
+            im1 = im1_o.unsqueeze(0).expand(self.branch, N_, 3, H_, W_)
 
             t0 = t0.reshape(N_, self.branch, 1, 1, 1).permute(1, 0, 2, 3, 4)
             t1 = t1.reshape(N_, self.branch, 1, 1, 1).permute(1, 0, 2, 3, 4)
@@ -2245,8 +2723,17 @@ class M2M_PWC(torch.nn.Module):
                 im0, flow0, t1, im1, flow1, t0, metric0, metric1
             )
 
-            tenOutput = tenOutput + mask * (t1.mean(0) * im0_o + t0.mean(0) * im1_o)
-
-            outputs.append((tenOutput * (tenStd_ + 0.0000001)) + tenMean_)
+            outputs.append(
+                blend(
+                    tenOutput,
+                    mask,
+                    im0_o,
+                    im1_o,
+                    t1.mean(0),
+                    t0.mean(0),
+                    tenStd_,
+                    tenMean_,
+                )
+            )
 
         return [output[:, :, :intHeight, :intWidth] for output in outputs]